@@ -5,6 +5,8 @@ from urllib.parse import quote
 
 import streamlit as st
 
+from query import QueryIndex, explain, search as run_query
+
 JSON_PATH = "index.json"
 
 # ---------- Utils ----------
@@ -51,16 +53,24 @@ def load_data(path):
         docs = data
 
     # dedupe by pub_url (kept exactly as before)
-    seen = set(); clean = []
-    for d in docs:
+    seen = set(); clean = []; kept = []
+    for i, d in enumerate(docs):
         key = (d.get("pub_url") or "").strip()
         if key and key not in seen:
             seen.add(key)
             clean.append(d)
+            kept.append(i)
 
-    # write back cleaned docs if we're in index mode
+    # write back cleaned docs if we're in index mode; per-doc columns stay aligned
     if isinstance(data, dict) and "docs" in data:
         data["docs"] = clean
+        if "tok_docs" in data:
+            data["tok_docs"] = [data["tok_docs"][i] for i in kept]
+        topics = data.get("topics")
+        if topics:
+            for col in ("label", "probs", "text_hash"):
+                if col in topics:
+                    topics[col] = [topics[col][i] for i in kept]
         return data
 
     # else (legacy list mode)
@@ -113,16 +123,25 @@ def score_doc(q_terms, tok_doc, idf, doc):
             score *= 1.15
     return score
 
-def search(query, docs, tok_docs, idf):
-    q_terms = tokenize(query)
-    scored = []
-    for i, d in enumerate(docs):
-        s = score_doc(q_terms, tok_docs[i], idf, d)
-        if s > 0:
-            scored.append((s, i))
-    scored.sort(reverse=True)
+@st.cache_resource(show_spinner=False)
+def build_query_index(docs, topic_labels=None):
+    """Postings + token positions per field for the boolean/fielded query engine."""
+    return QueryIndex(docs, topic_labels)
+
+def search(query, docs, tok_docs, idf, qindex):
+    """Boolean/fielded query (see query.py): the plan narrows the candidates, then
+       only those are scored. A plain list of words still means OR, as before."""
+    q_terms, scored = run_query(query, qindex, lambda terms, i: score_doc(terms, tok_docs[i], idf, docs[i]))
     return q_terms, [docs[i] for _, i in scored]
 
+def topic_of(i, topics):
+    """(label, prob) from the index's topic doc-values column, or (None, 0.0)."""
+    if not topics or i >= len(topics.get("label", [])):
+        return None, 0.0
+    label = topics["label"][i]
+    probs = topics["probs"][i]
+    return label, max(probs) if probs else 0.0
+
 # ---------- UI ----------
 st.set_page_config(page_title="Coventry EFA Scholar", page_icon="🔍", layout="wide")
 
@@ -143,6 +162,7 @@ with st.sidebar:
 # Load / rebuild
 if reload:
     st.cache_data.clear()
+    st.cache_resource.clear()
 
 loaded = load_data(JSON_PATH)
 if isinstance(loaded, dict) and "docs" in loaded:
@@ -150,18 +170,46 @@ if isinstance(loaded, dict) and "docs" in loaded:
     docs = loaded["docs"]
     tok_docs = loaded.get("tok_docs", [])
     idf = {k: float(v) for k, v in loaded.get("idf", {}).items()}
+    topics = loaded.get("topics")
 else:
     # Fallback for legacy res.json
     docs = loaded
     tok_docs, idf = build_index(docs)
+    topics = None
+# doc position for the topic column (results are doc dicts)
+doc_pos = {id(d): i for i, d in enumerate(docs)}
+qindex = build_query_index(docs, topics["label"] if topics else None)
 
 # Search box
-q = st.text_input("Search", placeholder="e.g. corporate governance, microfinance, Piotr Lis", label_visibility="collapsed")
+q = st.text_input("Search", placeholder='e.g. corporate governance, author:"Lis" AND governance NOT banking',
+                  label_visibility="collapsed")
 if not q:
     st.info("Type a query to start searching. Example: **finance innovation**")
+    st.caption('Operators: `AND` `OR` `NOT` `( )` `"phrase"` · fields: `title:` `abstract:` `author:` '
+               '`category:` `year:2020` / `year:2018..2022`')
     st.stop()
 
-q_terms, results = search(q, docs, tok_docs, idf)
+q_terms, results = search(q, docs, tok_docs, idf, qindex)
+with st.expander("Query plan", expanded=False):
+    st.code(explain(q, qindex), language=None)
+
+# Topic facet (labels predicted at index time by the Task 2 classifier)
+if topics:
+    counts = Counter(topic_of(doc_pos[id(d)], topics)[0] for d in results)
+    with st.sidebar:
+        st.markdown("---")
+        st.subheader("Topic")
+        chosen = st.multiselect("Topic", topics["labels"], default=[],
+                                format_func=lambda c: f"{c} ({counts.get(c, 0)})",
+                                label_visibility="collapsed")
+        min_conf = st.slider("Min. topic confidence", 0.0, 1.0, 0.0, 0.05)
+    if chosen or min_conf > 0:
+        keep = []
+        for d in results:
+            label, p = topic_of(doc_pos[id(d)], topics)
+            if (not chosen or label in chosen) and p >= min_conf:
+                keep.append(d)
+        results = keep
 
 # Optional sort by year
 if sort_mode.startswith("Year"):
@@ -205,6 +253,9 @@ for d in chunk:
             meta_bits.append(f"Dept author: [{cu}]({cu_url})")
         else:
             meta_bits.append(f"Dept author: {cu}")
+    label, p = topic_of(doc_pos[id(d)], topics)
+    if label:
+        meta_bits.append(f"Topic: {label} ({p:.2f})")
     if meta_bits:
         st.markdown(" · ".join(meta_bits))
 
@@ -1,30 +1,29 @@
-import time, json, traceback
+import time, json, traceback, os, argparse
 import re,math
 from collections import defaultdict
-from bs4 import BeautifulSoup
-
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import TimeoutException
-
-from webdriver_manager.chrome import ChromeDriverManager
 from urllib import robotparser
+# selenium, webdriver_manager and bs4 are imported inside the crawl functions, so
+# `--reindex` (and `import crawler`) work without a browser stack installed.
 
 # =====================
 # CONFIG
 # =====================
 SEED_PROFILES_URL = "https://pureportal.coventry.ac.uk/en/organisations/fbl-school-of-economics-finance-and-accounting/persons/"
 REQUEST_DELAY = 2  # polite delay in seconds
+INDEX_PATH = "index.json"
+# /fingerprints/ costs a second page load per publication; topics now come from the
+# Task 2 classifier at index time (topics.py), so fingerprints are opt-in.
+FETCH_FINGERPRINTS = os.getenv("FETCH_FINGERPRINTS", "0") == "1"
 pub_data = []
 
 # =====================
 # WebDriver factory
 # =====================
 def make_driver():
+    from selenium import webdriver
+    from selenium.webdriver.chrome.options import Options
+    from selenium.webdriver.chrome.service import Service
+    from webdriver_manager.chrome import ChromeDriverManager
     opts = Options()
     opts.add_argument("--headless=new")   # comment if you want a visible browser
     opts.add_argument("--no-sandbox")
@@ -42,6 +41,7 @@ def make_driver():
 # Robots.txt loader via Selenium
 # =====================
 def load_robots_with_selenium(driver, url="https://pureportal.coventry.ac.uk/robots.txt"):
+    from selenium.webdriver.common.by import By
     driver.get(url)
     time.sleep(1)
     try:
@@ -74,7 +74,14 @@ def polite_get(driver, url, rp=None):
 # =====================
 # Extract publication detail
 # =====================
-def crawl_detail(driver, pub_url, rp):
+def crawl_detail(driver, pub_url, rp, fingerprints=None):
+    from bs4 import BeautifulSoup
+    from selenium.common.exceptions import TimeoutException
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support import expected_conditions as EC
+    from selenium.webdriver.support.ui import WebDriverWait
+    if fingerprints is None:
+        fingerprints = FETCH_FINGERPRINTS
     abstract, topics, authors = "", [], []
     if not polite_get(driver, pub_url, rp):
         return abstract, topics, authors
@@ -110,13 +117,14 @@ def crawl_detail(driver, pub_url, rp):
     except Exception as e:
         print("Author parse failed:", e)
 
-    # --- Categories (fingerprints) ---
-    try:
-        polite_get(driver, pub_url.rstrip("/") + "/fingerprints/", rp)
-        for h3 in driver.find_elements(By.CSS_SELECTOR, "div.publication-fingerprint-thesauri > h3"):
-            topics.append(h3.text.strip())
-    except Exception:
-        pass
+    # --- Categories (fingerprints, optional) ---
+    if fingerprints:
+        try:
+            polite_get(driver, pub_url.rstrip("/") + "/fingerprints/", rp)
+            for h3 in driver.find_elements(By.CSS_SELECTOR, "div.publication-fingerprint-thesauri > h3"):
+                topics.append(h3.text.strip())
+        except Exception:
+            pass
 
     return abstract, topics, authors
 
@@ -124,6 +132,11 @@ def crawl_detail(driver, pub_url, rp):
 # Scrape one author
 # =====================
 def scrape_author(driver, author_url, rp):
+    from bs4 import BeautifulSoup
+    from selenium.common.exceptions import TimeoutException
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support import expected_conditions as EC
+    from selenium.webdriver.support.ui import WebDriverWait
     global pub_data
     if not polite_get(driver, author_url, rp):
         return
@@ -159,6 +172,7 @@ def scrape_author(driver, author_url, rp):
 # Collect School authors
 # =====================
 def collect_school_authors(driver, profiles_url, rp):
+    from bs4 import BeautifulSoup
     polite_get(driver, profiles_url, rp)
     soup = BeautifulSoup(driver.page_source, "lxml")
     links = set()
@@ -227,6 +241,46 @@ def _build_inverted_index(docs):
     }
 
 
+def _load_index(path=INDEX_PATH):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def write_index(docs, path=INDEX_PATH, previous=None):
+    """Build the inverted index plus the topic doc-values column and persist it.
+       Topics of docs already in the previous index are reused when the model is
+       unchanged; if no classifier is available the index is written without them."""
+    index = _build_inverted_index(docs)
+    if previous is None:
+        previous = _load_index(path)
+    try:
+        from topics import classify_docs
+        index["topics"] = classify_docs(docs, previous)
+    except Exception as e:
+        print(f"[topics] skipped: {e}")
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(index, f)
+    os.replace(tmp, path)
+    return index
+
+def reindex(path=INDEX_PATH, source=None):
+    """Rebuild index.json (tokens, idf, topics) from already crawled docs, no browser."""
+    previous = _load_index(path)
+    if source:
+        with open(source, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        docs = data["docs"] if isinstance(data, dict) else data
+    elif previous:
+        docs = previous["docs"]
+    else:
+        raise FileNotFoundError(f"Nothing to reindex: {path} not found")
+    index = write_index(docs, path, previous)
+    print(f"[OK] {path} rebuilt from {len(docs)} docs.")
+    return index
+
 # =====================
 # Orchestrator
 # =====================
@@ -251,9 +305,7 @@ def initCrawlerScraper(profiles_url=SEED_PROFILES_URL, max_authors=7):
         driver.quit()
 
     # NEW: build + persist inverted index for the app
-    index = _build_inverted_index(pub_data)
-    with open("index.json", "w", encoding="utf-8") as f:
-        json.dump(index, f)
+    write_index(pub_data)
 
     return pub_data
 
@@ -261,6 +313,20 @@ def initCrawlerScraper(profiles_url=SEED_PROFILES_URL, max_authors=7):
 # CLI + Weekly scheduler (schedule lib)
 # =====================
 if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Crawl Pure Portal publications and build index.json")
+    ap.add_argument("--reindex", action="store_true",
+                    help="Rebuild index.json (incl. topic labels) from existing docs without crawling")
+    ap.add_argument("--source", help="(reindex) Docs to index instead of index.json, e.g. res.json")
+    ap.add_argument("--fingerprints", action="store_true",
+                    help="Also load /fingerprints/ per publication for the category field")
+    ap.add_argument("--once", action="store_true", help="Crawl once and exit (no weekly schedule)")
+    args = ap.parse_args()
+    if args.fingerprints:
+        FETCH_FINGERPRINTS = True
+    if args.reindex:
+        reindex(INDEX_PATH, args.source)
+        raise SystemExit(0)
+
     import schedule
 
     def run_crawl():
@@ -270,6 +336,10 @@ if __name__ == "__main__":
         except Exception as e:
             traceback.print_exc()
 
+    if args.once:
+        run_crawl()
+        raise SystemExit(0)
+
     # Schedule: run once a week (e.g. every Monday at 02:00 AM)
     schedule.every().monday.at("02:00").do(run_crawl)
 
@@ -0,0 +1,398 @@
+# query.py
+# Boolean / fielded query engine for the search app.
+#
+#   author:"Lis" AND governance NOT banking
+#   (microfinance OR "financial inclusion") year:2018..2022
+#   title:risk category:Business
+#
+# Syntax: AND / OR / NOT (upper case; lower-case words are ordinary terms), parentheses,
+# "quoted phrases", field prefixes title: abstract: author: category: year:. Plain
+# juxtaposition is OR, as in the original bag-of-words search, except that a juxtaposed
+# NOT clause excludes (`a b NOT c` = (a OR b) AND NOT c). category: also matches the
+# topic predicted at index time. year: takes a year or a range (2018..2022 / 2018-2022).
+#
+# The query compiles to a plan over sorted postings lists: AND children run
+# smallest-first and are intersected by galloping search, NOT children are subtracted
+# the same way, phrases are intersected per term and then verified on token positions
+# of the surviving candidates only. The caller scores just the final doc ids.
+import re
+from bisect import bisect_left
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+FIELDS = ("title", "abstract", "author", "category", "year")
+ALL = "all"
+
+# same normalisation as app.py / crawler.py, so query terms match indexed tokens
+def norm(s: str) -> str:
+    if not s: return ""
+    s = s.lower()
+    s = re.sub(r"[^\w\s-]", " ", s)
+    s = re.sub(r"\s+", " ", s).strip()
+    return s
+
+def tokenize(s: str):
+    return [t for t in norm(s).split() if t]
+
+def extract_year(date_str: str):
+    if not date_str:
+        return -1
+    m = re.search(r"\b(20\d{2}|19\d{2})\b", date_str)
+    return int(m.group(1)) if m else -1
+
+# ---------- postings helpers ----------
+def _gallop(arr: Sequence[int], target: int, lo: int) -> int:
+    """Smallest i >= lo with arr[i] >= target: exponential probe, then binary search."""
+    n = len(arr)
+    if lo >= n or arr[lo] >= target:
+        return lo
+    step, prev = 1, lo
+    while True:
+        cur = prev + step
+        if cur >= n or arr[cur] >= target:
+            return bisect_left(arr, target, prev + 1, min(cur + 1, n))
+        prev, step = cur, step * 2
+
+def intersect(a: Sequence[int], b: Sequence[int]) -> List[int]:
+    if len(a) > len(b):
+        a, b = b, a
+    out, j, n = [], 0, len(b)
+    for x in a:
+        j = _gallop(b, x, j)
+        if j >= n:
+            break
+        if b[j] == x:
+            out.append(x)
+    return out
+
+def difference(a: Sequence[int], b: Sequence[int]) -> List[int]:
+    out, j, n = [], 0, len(b)
+    for x in a:
+        j = _gallop(b, x, j)
+        if j >= n or b[j] != x:
+            out.append(x)
+    return out
+
+def union(lists: Sequence[Sequence[int]]) -> List[int]:
+    if len(lists) == 1:
+        return list(lists[0])
+    return sorted(set().union(*lists))
+
+# ---------- plan nodes ----------
+class Node:
+    def estimate(self, ix: "QueryIndex") -> int: ...
+    def run(self, ix: "QueryIndex") -> List[int]: ...
+    def terms(self) -> List[str]:
+        return []
+
+class Term(Node):
+    def __init__(self, field: str, term: str):
+        self.field, self.term = field, term
+    def estimate(self, ix):
+        return len(ix.postings(self.field, self.term))
+    def run(self, ix):
+        return ix.postings(self.field, self.term)
+    def terms(self):
+        return [self.term]
+    def __str__(self):
+        return self.term if self.field == ALL else f"{self.field}:{self.term}"
+
+class Phrase(Node):
+    def __init__(self, field: str, words: List[str]):
+        self.field, self.words = field, words
+    def estimate(self, ix):
+        return min(len(ix.postings(self.field, w)) for w in self.words)
+    def run(self, ix):
+        lists = sorted((ix.postings(self.field, w) for w in set(self.words)), key=len)
+        cand = lists[0]
+        for p in lists[1:]:
+            if not cand:
+                break
+            cand = intersect(cand, p)
+        return [d for d in cand if ix.has_phrase(self.field, d, self.words)]
+    def terms(self):
+        return list(self.words)
+    def __str__(self):
+        s = '"' + " ".join(self.words) + '"'
+        return s if self.field == ALL else f"{self.field}:{s}"
+
+class Year(Node):
+    def __init__(self, lo: int, hi: int):
+        self.lo, self.hi = lo, hi
+    def run(self, ix):
+        return union([p for y, p in ix.years.items() if self.lo <= y <= self.hi] or [[]])
+    def estimate(self, ix):
+        return sum(len(p) for y, p in ix.years.items() if self.lo <= y <= self.hi)
+    def __str__(self):
+        return f"year:{self.lo}" if self.lo == self.hi else f"year:{self.lo}..{self.hi}"
+
+class Not(Node):
+    def __init__(self, child: Node):
+        self.child = child
+    def estimate(self, ix):
+        return ix.n_docs - self.child.estimate(ix)
+    def run(self, ix):
+        return difference(range(ix.n_docs), self.child.run(ix))
+    def __str__(self):
+        return f"NOT {self.child}"
+
+class And(Node):
+    def __init__(self, children: List[Node]):
+        self.children = children
+    def estimate(self, ix):
+        pos = [c.estimate(ix) for c in self.children if not isinstance(c, Not)]
+        return min(pos) if pos else ix.n_docs
+    def run(self, ix):
+        pos = sorted((c for c in self.children if not isinstance(c, Not)), key=lambda c: c.estimate(ix))
+        neg = [c.child for c in self.children if isinstance(c, Not)]
+        result = pos[0].run(ix) if pos else list(range(ix.n_docs))
+        for c in pos[1:]:
+            if not result:
+                return []
+            result = intersect(result, c.run(ix))
+        for c in neg:
+            if not result:
+                return []
+            result = difference(result, c.run(ix))
+        return result
+    def terms(self):
+        return [t for c in self.children if not isinstance(c, Not) for t in c.terms()]
+    def __str__(self):
+        return "(" + " AND ".join(str(c) for c in self.children) + ")"
+
+class Or(Node):
+    def __init__(self, children: List[Node]):
+        self.children = children
+    def estimate(self, ix):
+        return min(ix.n_docs, sum(c.estimate(ix) for c in self.children))
+    def run(self, ix):
+        return union([c.run(ix) for c in self.children])
+    def terms(self):
+        return [t for c in self.children for t in c.terms()]
+    def __str__(self):
+        return "(" + " OR ".join(str(c) for c in self.children) + ")"
+
+# ---------- parser ----------
+_TOKEN_RE = re.compile(r'\s*(?:(\()|(\))|(?:(\w+):)?(?:"([^"]*)"?|([^\s()"]+)))')
+_OPS = ("AND", "OR", "NOT")
+
+def _lex(q: str):
+    """[(kind, field, text)] with kind in ( ) AND OR NOT word phrase."""
+    out, pos = [], 0
+    while pos < len(q):
+        m = _TOKEN_RE.match(q, pos)
+        if not m or m.end() == pos:
+            pos += 1
+            continue
+        pos = m.end()
+        lp, rp, field, phrase, word = m.groups()
+        if lp:
+            out.append(("(", None, None))
+        elif rp:
+            out.append((")", None, None))
+        elif field and field.lower() not in FIELDS:
+            # not a field we know (e.g. "http:"): keep it as text
+            out.append(("phrase" if phrase is not None else "word", None,
+                        f"{field} {phrase if phrase is not None else word}"))
+        elif phrase is not None:
+            out.append(("phrase", field and field.lower(), phrase))
+        elif field is None and word in _OPS:
+            out.append((word, None, None))
+        else:
+            out.append(("word", field and field.lower(), word))
+    return out
+
+_YEAR_RE = re.compile(r"^(\d{4})(?:(?:\.\.|-)(\d{4}))?$")
+
+class Parser:
+    """Recursive descent; lenient: unbalanced parens and dangling operators are ignored.
+         expr   := seq
+         seq    := conj ((OR)? conj)*        juxtaposed NOT-clauses exclude
+         conj   := unary (AND unary)*
+         unary  := NOT unary | atom
+         atom   := ( expr ) | [field:] word | [field:] "phrase"
+    """
+
+    def __init__(self, q: str):
+        self.toks = _lex(q)
+        self.i = 0
+
+    def peek(self):
+        return self.toks[self.i][0] if self.i < len(self.toks) else None
+
+    def take(self):
+        tok = self.toks[self.i]
+        self.i += 1
+        return tok
+
+    def parse(self) -> Optional[Node]:
+        node = self.seq()
+        while self.i < len(self.toks):   # stray ")" at top level
+            self.take()
+            more = self.seq()
+            node = _or([node, more]) if node and more else node or more
+        return node
+
+    def seq(self) -> Optional[Node]:
+        pos, neg = [], []
+        explicit_or = False
+        while self.peek() not in (None, ")"):
+            if self.peek() == "OR":
+                self.take()
+                explicit_or = True
+                continue
+            node = self.conj()
+            if node is None:
+                continue
+            if isinstance(node, Not) and not explicit_or:
+                neg.append(node)
+            else:
+                pos.append(node)
+            explicit_or = False
+        if not pos and not neg:
+            return None
+        base = _or(pos) if pos else None
+        if not neg:
+            return base
+        if isinstance(base, And):
+            return And(base.children + neg)
+        return And(([base] if base else []) + neg)
+
+    def conj(self) -> Optional[Node]:
+        items = []
+        node = self.unary()
+        if node is not None:
+            items.append(node)
+        while self.peek() == "AND":
+            self.take()
+            node = self.unary()
+            if node is not None:
+                items.append(node)
+        if not items:
+            return None
+        return items[0] if len(items) == 1 else And(items)
+
+    def unary(self) -> Optional[Node]:
+        if self.peek() == "NOT":
+            self.take()
+            child = self.unary()
+            return Not(child) if child is not None else None
+        return self.atom()
+
+    def atom(self) -> Optional[Node]:
+        kind = self.peek()
+        if kind is None:
+            return None
+        if kind == "(":
+            self.take()
+            node = self.seq()
+            if self.peek() == ")":
+                self.take()
+            return node
+        if kind in ("AND", ")"):
+            self.take()          # dangling operator
+            return None
+        kind, field, text = self.take()
+        return _leaf(field or ALL, text, phrase=(kind == "phrase"))
+
+def _or(nodes: List[Node]) -> Node:
+    return nodes[0] if len(nodes) == 1 else Or(nodes)
+
+def _leaf(field: str, text: str, phrase: bool) -> Optional[Node]:
+    if field == "year":
+        m = _YEAR_RE.match(text.strip())
+        if not m:
+            return None
+        lo = int(m.group(1))
+        hi = int(m.group(2) or lo)
+        return Year(min(lo, hi), max(lo, hi))
+    words = tokenize(text)
+    if not words:
+        return None
+    if len(words) == 1:
+        return Term(field, words[0])
+    if phrase:
+        return Phrase(field, words)
+    # an unquoted word that normalizes to several ("o'brien"): OR, like the old search
+    return Or([Term(field, w) for w in words])
+
+def parse(q: str) -> Optional[Node]:
+    return Parser(q).parse()
+
+# ---------- index ----------
+class QueryIndex:
+    """Per-field positional token segments and sorted postings lists, built from docs.
+       "all" covers the same fields as the TF-IDF index (title, abstract, Coventry
+       author, category, co-authors); category also holds the predicted topic."""
+
+    def __init__(self, docs: List[dict], topic_labels: Optional[List[str]] = None):
+        self.n_docs = len(docs)
+        self._postings: Dict[str, Dict[str, List[int]]] = {f: {} for f in FIELDS + (ALL,)}
+        self._segments: Dict[str, List[List[List[str]]]] = {f: [] for f in FIELDS + (ALL,)}
+        self.years: Dict[int, List[int]] = {}
+        for i, d in enumerate(docs):
+            cats = d.get("category") or []
+            if isinstance(cats, str):
+                cats = [cats]
+            authors = [d.get("cu_author") or ""] + [(ca or {}).get("name", "") or "" for ca in d.get("co_authors", [])]
+            fields = {
+                "title": [d.get("title") or ""],
+                "abstract": [d.get("abstract") or ""],
+                "author": authors,
+                "category": list(cats) + ([topic_labels[i]] if topic_labels and i < len(topic_labels)
+                                          and topic_labels[i] else []),
+                ALL: [d.get("title") or "", d.get("abstract") or "", d.get("cu_author") or "",
+                      " ".join(cats)] + authors[1:],
+            }
+            for f, texts in fields.items():
+                segs = [tokenize(t) for t in texts]
+                self._segments[f].append(segs)
+                post = self._postings[f]
+                for t in {t for seg in segs for t in seg}:
+                    post.setdefault(t, []).append(i)   # i ascending: lists stay sorted
+            y = extract_year(d.get("date", ""))
+            if y > 0:
+                self.years.setdefault(y, []).append(i)
+
+    def postings(self, field: str, term: str) -> List[int]:
+        return self._postings.get(field, {}).get(term, [])
+
+    def has_phrase(self, field: str, doc: int, words: List[str]) -> bool:
+        k = len(words)
+        for seg in self._segments[field][doc]:
+            for j in range(len(seg) - k + 1):
+                if seg[j] == words[0] and seg[j:j + k] == words:
+                    return True
+        return False
+
+# ---------- entry points ----------
+def execute(q: str, ix: QueryIndex) -> Tuple[List[str], List[int]]:
+    """(positive query terms for scoring/highlighting, matching doc ids ascending)."""
+    node = parse(q)
+    if node is None:
+        return [], []
+    return node.terms(), node.run(ix)
+
+def explain(q: str, ix: QueryIndex) -> str:
+    """Plan as executed: AND children in run order with their estimated sizes."""
+    def fmt(node, depth=0):
+        pad = "  " * depth
+        if isinstance(node, And):
+            pos = sorted((c for c in node.children if not isinstance(c, Not)), key=lambda c: c.estimate(ix))
+            neg = [c for c in node.children if isinstance(c, Not)]
+            lines = [f"{pad}AND (smallest first)"]
+            lines += [fmt(c, depth + 1) for c in pos]
+            lines += [f"{pad}  MINUS {c.child} ~{c.child.estimate(ix)}" for c in neg]
+            return "\n".join(lines)
+        if isinstance(node, Or):
+            return "\n".join([f"{pad}OR"] + [fmt(c, depth + 1) for c in node.children])
+        return f"{pad}{node} ~{node.estimate(ix)}"
+    node = parse(q)
+    return fmt(node) if node is not None else "(empty query)"
+
+def search(q: str, ix: QueryIndex, score: Callable[[List[str], int], float]) -> Tuple[List[str], List[Tuple[float, int]]]:
+    """Run the plan, then score only the surviving doc ids. Returns (terms, [(score, id)])
+       sorted best first."""
+    terms, ids = execute(q, ix)
+    scored = [(score(terms, i), i) for i in ids]
+    scored.sort(reverse=True)
+    return terms, scored
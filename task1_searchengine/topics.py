@@ -0,0 +1,81 @@
+# topics.py
+# Index-time topic labels from the Task 2 classifier (Politics / Business / Health).
+# Runs the trained pipeline in vectorized batches over title + abstract and returns a
+# doc-values column aligned with index["docs"], so the app can facet on it without
+# loading the model:
+#
+#   "topics": {
+#     "model":  "v0003",                      # classifier version used
+#     "labels": ["Business", "Health", ...],  # column order of "probs"
+#     "label":  ["Business", ...],            # top label per doc
+#     "probs":  [[0.81, 0.07, 0.12], ...],    # per doc, in "labels" order
+#     "text_hash": ["3f1c9a0e2b7d4c51", ...]  # per doc, of the classified title + abstract
+#   }
+import hashlib, os, sys
+from pathlib import Path
+
+TASK2_DIR = Path(os.getenv("TASK2_DIR", str(Path(__file__).resolve().parent.parent / "task2_classifier")))
+TOPIC_BATCH_SIZE = int(os.getenv("TOPIC_BATCH_SIZE", "256"))
+
+def doc_text(d) -> str:
+    return " ".join(x for x in (d.get("title") or "", d.get("abstract") or "") if x)
+
+def text_hash(d) -> str:
+    return hashlib.sha1(doc_text(d).encode("utf-8")).hexdigest()[:16]
+
+def _use_task2():
+    """Make Task 2's `src` package importable."""
+    if str(TASK2_DIR) not in sys.path:
+        sys.path.insert(0, str(TASK2_DIR))
+
+def load_classifier():
+    """(version, model) of the classifier Task 2 serves: its registry's CURRENT
+       version, or its MODEL_PATH (both honour Task 2's env overrides)."""
+    _use_task2()
+    from src.config import MODEL_PATH, REGISTRY_DIR
+    from src.models.predict import load_model
+    from src.models.registry import current_version, resolve
+
+    if "MODEL_PATH" not in os.environ and current_version(REGISTRY_DIR):
+        version, path = resolve(REGISTRY_DIR)
+    else:
+        path = MODEL_PATH
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"Topic model not found: {path}. Train Task 2 first.")
+        version = f"file@{int(os.path.getmtime(path))}"
+    return version, load_model(str(path))
+
+def classify_docs(docs, previous=None, batch_size=TOPIC_BATCH_SIZE, model=None):
+    """Topic column for `docs`. Docs whose title + abstract were already labelled in
+       `previous` (an earlier index) by the same model version keep their labels; new
+       or edited ones are scored."""
+    version, clf = model or load_classifier()
+    _use_task2()
+    from src.models.predict import predict_proba_batch
+
+    prev_topics = (previous or {}).get("topics") or {}
+    reuse = {}
+    if prev_topics.get("model") == version:
+        reuse = dict(zip(prev_topics.get("text_hash", []),
+                         zip(prev_topics.get("label", []), prev_topics.get("probs", []))))
+
+    labels = [str(c) for c in clf.classes_]
+    hashes = [text_hash(d) for d in docs]
+    out_label, out_probs = [None] * len(docs), [None] * len(docs)
+    todo = []
+    for i, h in enumerate(hashes):
+        hit = reuse.get(h)
+        if hit:
+            out_label[i], out_probs[i] = hit
+        else:
+            todo.append(i)
+
+    for start in range(0, len(todo), batch_size):
+        idx = todo[start:start + batch_size]
+        for i, pairs in zip(idx, predict_proba_batch(clf, [doc_text(docs[j]) for j in idx])):
+            by_class = dict(pairs)
+            out_label[i] = str(pairs[0][0])
+            out_probs[i] = [round(float(by_class.get(c, 0.0)), 4) for c in labels]
+    print(f"[topics] model={version} classified={len(todo)} reused={len(docs) - len(todo)}", flush=True)
+    return {"model": version, "labels": labels, "label": out_label, "probs": out_probs,
+            "text_hash": hashes}
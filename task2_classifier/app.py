@@ -3,24 +3,79 @@
 # Place this file at the project root: task2-classifier/app.py
 # Run: python app.py   → http://127.0.0.1:5000/
 
-import os
+import os, signal, threading, time
 from typing import Dict, List, Tuple
-from flask import Flask, request, render_template_string, jsonify
-from src.config import MODEL_PATH, ensure_dirs
-from src.models.predict import load_model
+from flask import Flask, Response, g, request, render_template_string, jsonify
+from src.config import (MODEL_PATH, REGISTRY_DIR, BATCH_MAX_SIZE, BATCH_MAX_WAIT_MS,
+                        PRED_CACHE_SIZE, PRED_CACHE_TTL_S, PROFILE_STAGES, ensure_dirs)
+from src.models.predict import load_model, predict_proba_batch, warm_up
+from src.models.registry import activate, current_version, list_versions, resolve, rollback
+from src.serving.batcher import MicroBatcher
+from src.serving.cache import PredictionCache, text_key
+from src.serving.metrics import CONTENT_TYPE, SIZE_BUCKETS, Registry
 
 # ------------------------------
-# App + lazy model loader
+# App + model loader (eager at startup, lazy fallback)
 # ------------------------------
 app = Flask(__name__)
-_model = None  # lazy-loaded on first request
+# (version, model) of the model serving traffic. Replaced as a whole, never mutated,
+# so a request sees either the old or the new model, never a half-loaded one.
+_active = None
+_previous = None                 # last active (version, model), kept warm for /rollback
+_load_lock = threading.Lock()    # serializes first load and swaps
+_reload_lock = threading.Lock()  # one background reload at a time
+_last_reload: Dict[str, object] = {}
+
+def _resolve_artifact(version: str = None) -> Tuple[str, str]:
+    """(version, path) to serve: an explicit MODEL_PATH env var wins, then the
+       registry's CURRENT (or `version`), then the default MODEL_PATH."""
+    if version or ("MODEL_PATH" not in os.environ and current_version(REGISTRY_DIR)):
+        v, path = resolve(REGISTRY_DIR, version)
+        return v, str(path)
+    if not os.path.exists(MODEL_PATH):
+        raise FileNotFoundError(f"Model not found: {MODEL_PATH}. Run training first.")
+    return f"file@{int(os.path.getmtime(MODEL_PATH))}", str(MODEL_PATH)
+
+def _load(version: str = None) -> Tuple[str, object]:
+    v, path = _resolve_artifact(version)
+    model = load_model(path)  # raises FileNotFoundError if not trained
+    warm_up(model)
+    return v, model
+
+def _swap(entry: Tuple[str, object]) -> None:
+    global _active, _previous
+    if _active is not None and _active[0] != entry[0]:   # a same-version reload keeps _previous
+        _previous = _active
+    _active = entry
+    _cache.clear()
+    MODEL_INFO.replace(1, version=entry[0])
+
+def model_version():
+    entry = _active
+    return entry[0] if entry else None
 
 def get_model():
-    global _model
-    if _model is None:
-        ensure_dirs()
-        _model = load_model(MODEL_PATH)  # raises FileNotFoundError if not trained
-    return _model
+    entry = _active
+    if entry is None:
+        with _load_lock:
+            if _active is None:
+                ensure_dirs()
+                _swap(_load())
+            entry = _active
+    return entry[1]
+
+def startup(background: bool = False):
+    """Load + warm up the model before traffic arrives. With background=True the
+       server can start listening at once; /healthz reports ready only when done."""
+    def _load():
+        try:
+            get_model()
+        except FileNotFoundError as e:
+            print(f"[startup] {e}", flush=True)
+    if background:
+        threading.Thread(target=_load, name="model-warmup", daemon=True).start()
+    else:
+        _load()
 
 # ------------------------------
 # Utilities
@@ -28,16 +83,74 @@ def get_model():
 def probs_from_model(pipeline, text: str) -> List[Tuple[str, float]]:
     """Return [(class, prob), ...] descending if model supports predict_proba.
        If not supported, returns [(pred, 1.0)]."""
-    clf = pipeline.named_steps.get("clf")
-    vec = pipeline.named_steps.get("vec")
-    if hasattr(clf, "predict_proba"):
-        pr = clf.predict_proba(vec.transform([text]))[0]
-        classes = clf.classes_
-        pairs = sorted(zip(classes, pr), key=lambda x: -x[1])
+    return predict_proba_batch(pipeline, [text])[0]
+
+# ------------------------------
+# Metrics (Prometheus text format on /metrics)
+# ------------------------------
+metrics = Registry()
+REQUESTS = metrics.counter("classifier_requests_total", "HTTP requests by endpoint and status code.",
+                           ("endpoint", "method", "code"))
+ERRORS = metrics.counter("classifier_request_errors_total",
+                         "Requests that failed with a 5xx or a classification error.", ("endpoint",))
+REQUEST_LATENCY = metrics.histogram("classifier_request_duration_seconds",
+                                    "HTTP request latency.", ("endpoint",))
+BATCH_SIZE = metrics.histogram("classifier_batch_size", "Texts scored per model call.",
+                               buckets=SIZE_BUCKETS)
+STAGE_LATENCY = metrics.histogram("classifier_stage_duration_seconds",
+                                  "Inference time per pipeline stage and model call.", ("stage",))
+CACHE_LOOKUPS = metrics.counter("classifier_cache_lookups_total", "Prediction cache lookups.", ("result",))
+MODEL_INFO = metrics.gauge("classifier_model_info", "Model version being served (value is always 1).",
+                           ("version",))
+
+def _stage_timer(stage: str, seconds: float) -> None:
+    STAGE_LATENCY.observe(seconds, stage=stage)
+
+def _score(texts: List[str]) -> List[List[Tuple[str, float]]]:
+    BATCH_SIZE.observe(len(texts))
+    return predict_proba_batch(get_model(), texts, _stage_timer if PROFILE_STAGES else None)
+
+@app.before_request
+def _metrics_start():
+    g.metrics_t0 = time.perf_counter()
+
+@app.after_request
+def _metrics_end(response):
+    endpoint = request.url_rule.rule if request.url_rule else "other"   # bounded label values
+    REQUESTS.inc(endpoint=endpoint, method=request.method, code=response.status_code)
+    REQUEST_LATENCY.observe(time.perf_counter() - g.get("metrics_t0", time.perf_counter()), endpoint=endpoint)
+    if response.status_code >= 500 or g.get("classify_failed"):
+        ERRORS.inc(endpoint=endpoint)
+    return response
+
+# Concurrent requests are coalesced into one vectorized transform + predict_proba;
+# the model is resolved per batch so /reload takes effect on the next batch.
+_batcher = MicroBatcher(_score, max_batch=BATCH_MAX_SIZE, max_wait_ms=BATCH_MAX_WAIT_MS)
+
+def configure_batching(max_size: int, max_wait_ms: float) -> None:
+    """Replace the micro-batcher settings (the bench compares them in one process)."""
+    global _batcher
+    _batcher = MicroBatcher(_score, max_batch=max_size, max_wait_ms=max_wait_ms)
+
+# Syndicated snippets repeat a lot: memoize probs per (model version, normalized text).
+_cache = PredictionCache(PRED_CACHE_SIZE, PRED_CACHE_TTL_S)
+
+def classify(text: str) -> List[Tuple[str, float]]:
+    """probs_from_model for request handlers: cached, then micro-batched unless BATCH_MAX_SIZE=1."""
+    get_model()   # loads on first use, so the key carries the real version
+    key = (model_version(), text_key(text))
+    pairs = _cache.get(key)
+    if pairs is not None:
+        CACHE_LOOKUPS.inc(result="hit")
         return pairs
-    # fallback: no probabilities
-    pred = pipeline.predict([text])[0]
-    return [(pred, 1.0)]
+    CACHE_LOOKUPS.inc(result="miss")
+    try:
+        pairs = _score([text])[0] if _batcher.max_batch <= 1 else _batcher(text)
+    except Exception:
+        g.classify_failed = True   # the home page reports errors with a 200
+        raise
+    _cache.put(key, pairs)
+    return pairs
 
 # ------------------------------
 # HTML (inline template)
@@ -127,8 +240,7 @@ def home():
             error = "Please paste some text to classify."
         else:
             try:
-                model = get_model()
-                pairs = probs_from_model(model, q)
+                pairs = classify(q)
                 probs = pairs
                 top_c, top_p = pairs[0]
                 # formatted line e.g., "Predicted: Health | Politics:0.12, Business:0.08, Health:0.80"
@@ -147,8 +259,7 @@ def api_predict():
         txt = (data.get("text") or "").strip()
         if not txt:
             return jsonify({"error": "Missing 'text'"}), 400
-        model = get_model()
-        pairs = probs_from_model(model, txt)
+        pairs = classify(txt)
         top_c, top_p = pairs[0]
         return jsonify({
             "result": f"Predicted: {top_c}",
@@ -159,22 +270,109 @@ def api_predict():
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
-@app.route("/reload", methods=["POST"])
-def reload_model():
-    """Reload model from disk without restarting the server (use after re-training)."""
-    global _model
-    _model = None
+def install_model(model, version: str) -> None:
+    """Serve an already-loaded model (benchmarks, embedding): warm it up, then swap it in."""
+    warm_up(model)
+    with _load_lock:
+        _swap((version, model))
+
+def reload_now(version: str = None) -> str:
+    """Load + warm up `version` (default: current), then swap it in. Returns the version."""
+    entry = _load(version)
+    with _load_lock:
+        _swap(entry)
+    return entry[0]
+
+def _prefork_master():
+    """PID of the `serve` master when running as a pre-forked worker, else None."""
+    pid = app.config.get("PREFORK_MASTER_PID")
+    return pid if pid and pid != os.getpid() else None
+
+def _reload_worker(version: str = None) -> None:
+    global _last_reload
     try:
-        get_model()
-        return jsonify({"ok": True, "message": "Model reloaded."})
+        _last_reload = {"ok": True, "version": reload_now(version)}  # off the request path
     except Exception as e:
-        return jsonify({"ok": False, "error": str(e)}), 500
+        _last_reload = {"ok": False, "error": str(e)}
+    finally:
+        _reload_lock.release()
+
+@app.route("/reload", methods=["POST"])
+def reload_model():
+    """Load the registry's current version (or `version`) in the background, warm it up,
+       then swap it in atomically; requests keep using the old model meanwhile.
+       Pass wait=1 (JSON body or query) to block until the swap is done."""
+    data = request.get_json(silent=True) or {}
+    version = data.get("version") or request.args.get("version")
+    wait = str(data.get("wait", request.args.get("wait", ""))).lower() in ("1", "true", "yes")
+    master = _prefork_master()
+    if master:
+        # pre-forked workers: the master reloads once and restarts every worker
+        try:
+            if version:
+                activate(REGISTRY_DIR, version)
+            os.kill(master, signal.SIGHUP)
+        except Exception as e:
+            return jsonify({"ok": False, "error": str(e)}), 500
+        return jsonify({"ok": True, "message": "Graceful restart of all workers requested.",
+                        "serving": model_version()}), 202
+    if not _reload_lock.acquire(blocking=False):
+        return jsonify({"ok": False, "error": "A reload is already in progress."}), 409
+    t = threading.Thread(target=_reload_worker, args=(version,), name="model-reload", daemon=True)
+    t.start()
+    if not wait:
+        return jsonify({"ok": True, "message": "Reloading in background.", "serving": model_version()}), 202
+    t.join()
+    if _last_reload.get("ok"):
+        return jsonify({"ok": True, "message": "Model reloaded.", "version": _last_reload["version"]})
+    return jsonify(_last_reload), 500
+
+@app.route("/rollback", methods=["POST"])
+def rollback_model():
+    """Swap back to the previously served model (still warm in memory) and point the
+       registry's CURRENT at it so a restart serves the same version. Under `serve`,
+       the registry is rolled back and the master restarts the workers."""
+    master = _prefork_master()
+    if master:
+        try:
+            version = rollback(REGISTRY_DIR)
+            os.kill(master, signal.SIGHUP)
+        except Exception as e:
+            return jsonify({"ok": False, "error": str(e)}), 409
+        return jsonify({"ok": True, "version": version,
+                        "message": "Graceful restart of all workers requested."}), 202
+    with _load_lock:
+        if _previous is None:
+            return jsonify({"ok": False, "error": "No previous model loaded in this process."}), 409
+        _swap(_previous)
+        version = _active[0]
+    if version in list_versions(REGISTRY_DIR):
+        activate(REGISTRY_DIR, version)
+    return jsonify({"ok": True, "version": version})
+
+@app.route("/stats", methods=["GET"])
+def stats():
+    return jsonify({
+        "model_version": model_version(),
+        "previous_version": _previous[0] if _previous else None,
+        "last_reload": _last_reload,
+        "cache": _cache.stats(),
+        "batcher": {"batches": _batcher.batches, "items": _batcher.items},
+    })
+
+@app.route("/metrics", methods=["GET"])
+def metrics_endpoint():
+    """Prometheus scrape target. Under `serve`, totals over all workers (gauges per worker)."""
+    return Response(metrics.render(), content_type=CONTENT_TYPE)
 
 @app.route("/healthz", methods=["GET"])
 def health():
+    if _active is None and _load_lock.locked():
+        # startup warm-up still running: up, but not ready for traffic
+        return jsonify({"ok": False, "ready": False}), 503
     try:
         get_model()
-        return jsonify({"ok": True})
+        return jsonify({"ok": True, "ready": True, "version": model_version()})
     except FileNotFoundError:
         # App is up, but model not trained yet
         return jsonify({"ok": True, "model": "missing"}), 200
@@ -183,4 +381,5 @@ if __name__ == "__main__":
     # You can change host/port via env vars, e.g. PORT=5001 python app.py
     host = os.getenv("HOST", "127.0.0.1")
     port = int(os.getenv("PORT", "5000"))
-    app.run(host=host, port=port, debug=False)
+    startup()
+    app.run(host=host, port=port, debug=False, threaded=True)
@@ -0,0 +1,86 @@
+# src/bench/features.py
+# Compare feature backends (vocabulary TF-IDF union vs. HashingVectorizer) on
+# accuracy, serialized model size, load time and predict latency.
+import io, time
+from typing import Dict, List
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.metrics import accuracy_score, f1_score
+from sklearn.model_selection import train_test_split
+from sklearn.pipeline import Pipeline
+
+from ..config import RSEED
+from ..features.vectorizer import FEATURE_BACKENDS, DEFAULT_N_FEATURES, build_vectorizer
+from ..models.train import CANDIDATES, build_classifier, balanced_sample_weight
+
+def _latency_ms(pipe: Pipeline, texts: List[str], repeats: int, batch_repeats: int = 5) -> Dict[str, float]:
+    times = []
+    for i in range(repeats):
+        t0 = time.perf_counter()
+        pipe.predict_proba([texts[i % len(texts)]])
+        times.append((time.perf_counter() - t0) * 1000.0)
+    batch = []
+    for _ in range(batch_repeats):
+        t0 = time.perf_counter()
+        pipe.predict_proba(texts)
+        batch.append(time.perf_counter() - t0)
+    batch_s = float(np.median(batch))
+    return {
+        "single_p50_ms": float(np.percentile(times, 50)),
+        "single_p95_ms": float(np.percentile(times, 95)),
+        "batch_docs_per_s": len(texts) / batch_s if batch_s > 0 else float("inf"),
+    }
+
+def compare_feature_backends(
+    df: pd.DataFrame,
+    test_size: float = 0.2,
+    n_features: int = DEFAULT_N_FEATURES,
+    repeats: int = 200,
+) -> List[dict]:
+    X_train, X_test, y_train, y_test = train_test_split(
+        df["text"], df["label"], test_size=test_size, random_state=RSEED, stratify=df["label"]
+    )
+    sample_weight = balanced_sample_weight(y_train)
+    test_texts = list(X_test)
+    rows = []
+    for kind in FEATURE_BACKENDS:
+        for name in CANDIDATES:
+            pipe = Pipeline([("vec", build_vectorizer(kind, n_features)), ("clf", build_classifier(name))])
+            t0 = time.perf_counter()
+            if name == "MultinomialNB":
+                pipe.fit(X_train, y_train, clf__sample_weight=sample_weight)
+            else:
+                pipe.fit(X_train, y_train)
+            fit_s = time.perf_counter() - t0
+            pred = pipe.predict(X_test)
+
+            buf = io.BytesIO()
+            joblib.dump(pipe, buf)
+            size = buf.tell()
+            buf.seek(0)
+            t0 = time.perf_counter()
+            joblib.load(buf)
+            load_s = time.perf_counter() - t0
+
+            row = {
+                "features": kind,
+                "n_features": n_features if kind == "hashing" else None,
+                "model": name,
+                "accuracy": float(accuracy_score(y_test, pred)),
+                "macro_f1": float(f1_score(y_test, pred, average="macro", zero_division=0)),
+                "fit_s": fit_s,
+                "model_bytes": size,
+                "load_s": load_s,
+            }
+            row.update(_latency_ms(pipe, test_texts, repeats))
+            rows.append(row)
+
+    print(f"\n{'features':<9} {'model':<14} {'acc':>6} {'f1':>6} {'fit_s':>7} {'size_kb':>9} "
+          f"{'load_ms':>8} {'p50_ms':>7} {'p95_ms':>7} {'batch/s':>9}")
+    for r in rows:
+        print(f"{r['features']:<9} {r['model']:<14} {r['accuracy']:>6.3f} {r['macro_f1']:>6.3f} "
+              f"{r['fit_s']:>7.2f} {r['model_bytes'] / 1024:>9.0f} {r['load_s'] * 1000:>8.1f} "
+              f"{r['single_p50_ms']:>7.2f} {r['single_p95_ms']:>7.2f} {r['batch_docs_per_s']:>9.0f}")
+    return rows
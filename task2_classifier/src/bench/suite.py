@@ -0,0 +1,402 @@
+# src/bench/suite.py
+# Classifier performance benchmark: training stages, artifact size/load time,
+# predict latency by text length and batch size, HTTP throughput of the Flask app (also
+# with micro-batching off vs on), CLI import time and peak memory. Results are written as
+# JSON so runs can be diffed over time.
+import gc, json, logging, os, platform, random, resource, subprocess, sys, tempfile, threading, time, tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Dict, List, Sequence
+
+import joblib
+import numpy as np
+import pandas as pd
+import sklearn
+from sklearn.metrics import accuracy_score
+from sklearn.model_selection import train_test_split
+from sklearn.pipeline import FeatureUnion, Pipeline
+
+from ..config import BATCH_MAX_SIZE, BATCH_MAX_WAIT_MS, BENCH_SECTIONS, RSEED, SRC_DIR
+from ..features.vectorizer import DEFAULT_N_FEATURES, build_vectorizer_hashing, build_vectorizer_union
+from ..models.artifact import export_compact, load_compact
+from ..models.predict import predict_proba_batch
+from ..models.train import build_classifier, balanced_sample_weight
+from .features import compare_feature_backends
+
+SECTIONS = BENCH_SECTIONS
+
+def _union_part(name: str) -> Callable[[int], FeatureUnion]:
+    return lambda n_features: FeatureUnion([t for t in build_vectorizer_union().transformer_list if t[0] == name])
+
+# Vectorizer configurations swept by the suite, built from the train-time builders;
+# each takes the hashed width (--n-features), which only the hashing config uses.
+VECTORIZER_CONFIGS: Dict[str, Callable[[int], FeatureUnion]] = {
+    "union": lambda n_features: build_vectorizer_union(),
+    "union-word": _union_part("word"),
+    "union-char": _union_part("char"),
+    "hashing": build_vectorizer_hashing,
+}
+
+def _pct(values: Sequence[float]) -> Dict[str, float]:
+    a = np.asarray(values, dtype=float)
+    return {"p50": float(np.percentile(a, 50)), "p95": float(np.percentile(a, 95)),
+            "p99": float(np.percentile(a, 99)), "mean": float(a.mean())}
+
+def _peak_rss_mb() -> float:
+    r = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return r / (1024 * 1024) if sys.platform == "darwin" else r / 1024   # bytes on macOS, KiB on Linux
+
+def synthetic_corpus(df: pd.DataFrame, scale: int, seed: int = RSEED) -> pd.DataFrame:
+    """`scale` copies of the corpus; every extra copy drops ~15% of each text's words
+       so the vocabulary and n-gram statistics grow like real extra data would."""
+    if scale <= 1:
+        return df[["label", "text"]].reset_index(drop=True)
+    rng = random.Random(seed)
+    parts = [df[["label", "text"]]]
+    for _ in range(scale - 1):
+        texts = [" ".join(w for w in t.split() if rng.random() > 0.15) or t for t in df["text"].astype(str)]
+        parts.append(pd.DataFrame({"label": df["label"].to_numpy(), "text": texts}))
+    return pd.concat(parts, ignore_index=True)
+
+def texts_of_length(df: pd.DataFrame, n_words: int, count: int, seed: int = RSEED) -> List[str]:
+    """`count` texts of exactly `n_words` words, stitched together from corpus texts."""
+    rng = random.Random(seed)
+    words = " ".join(df["text"].astype(str)).split()
+    out = []
+    for _ in range(count):
+        start = rng.randrange(max(1, len(words) - n_words))
+        chunk = words[start:start + n_words]
+        while len(chunk) < n_words:
+            chunk += words[:n_words - len(chunk)]
+        out.append(" ".join(chunk))
+    return out
+
+# ------------------------------
+# Sections
+# ------------------------------
+def bench_training(df: pd.DataFrame, scales: Sequence[int], test_size: float, model: str = "MultinomialNB",
+                   n_features: int = DEFAULT_N_FEATURES) -> List[dict]:
+    rows = []
+    for scale in scales:
+        data = synthetic_corpus(df, scale)
+        X_train, X_test, y_train, y_test = train_test_split(
+            data["text"], data["label"], test_size=test_size, random_state=RSEED, stratify=data["label"])
+        for cfg, build in VECTORIZER_CONFIGS.items():
+            gc.collect()
+            tracemalloc.start()
+            vec = build(n_features)
+            t0 = time.perf_counter()
+            F_train = vec.fit_transform(X_train)
+            featurize_s = time.perf_counter() - t0
+            clf = build_classifier(model)
+            t0 = time.perf_counter()
+            if model == "MultinomialNB":
+                clf.fit(F_train, y_train, sample_weight=balanced_sample_weight(y_train))
+            else:
+                clf.fit(F_train, y_train)
+            fit_s = time.perf_counter() - t0
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            acc = accuracy_score(y_test, clf.predict(vec.transform(X_test)))
+            rows.append({"config": cfg, "scale": scale, "rows": len(data), "model": model,
+                         "n_features": int(F_train.shape[1]), "featurize_s": featurize_s, "fit_s": fit_s,
+                         "train_peak_mb": peak / 2**20, "accuracy": float(acc)})
+            print(f"[bench] train {cfg:<10} x{scale:<3} rows={len(data):<6} featurize={featurize_s:.3f}s "
+                  f"fit={fit_s:.3f}s peak={peak / 2**20:.1f}MB acc={acc:.3f}", flush=True)
+    return rows
+
+def _fit(df: pd.DataFrame, cfg: str, model: str = "MultinomialNB",
+         n_features: int = DEFAULT_N_FEATURES) -> Pipeline:
+    pipe = Pipeline([("vec", VECTORIZER_CONFIGS[cfg](n_features)), ("clf", build_classifier(model))])
+    if model == "MultinomialNB":
+        pipe.fit(df["text"], df["label"], clf__sample_weight=balanced_sample_weight(df["label"]))
+    else:
+        pipe.fit(df["text"], df["label"])
+    return pipe
+
+def bench_artifacts(models: Dict[str, Pipeline], repeats: int = 5) -> List[dict]:
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for cfg, pipe in models.items():
+            jl = Path(tmp) / f"{cfg}.joblib"
+            joblib.dump(pipe, jl)
+            cd = Path(tmp) / f"{cfg}.compact"
+            export_compact(pipe, cd)
+            for fmt, path, loader in (("joblib", jl, joblib.load), ("compact", cd, load_compact)):
+                size = path.stat().st_size if path.is_file() else sum(f.stat().st_size for f in path.iterdir())
+                times = []
+                for _ in range(repeats):
+                    t0 = time.perf_counter()
+                    m = loader(path)
+                    predict_proba_batch(m, ["warm up"])   # first prediction is part of cold start
+                    times.append(time.perf_counter() - t0)
+                rows.append({"config": cfg, "format": fmt, "bytes": size, "load_s": _pct(times)})
+                print(f"[bench] artifact {cfg:<10} {fmt:<7} {size / 1024:>9.0f} KB  "
+                      f"load+first p50={np.median(times) * 1000:.1f}ms", flush=True)
+    return rows
+
+def bench_latency(models: Dict[str, Pipeline], df: pd.DataFrame, lengths: Sequence[int],
+                  batch_sizes: Sequence[int] = (1, 32, 256), repeats: int = 200,
+                  batch_repeats: int = 7) -> List[dict]:
+    rows = []
+    for cfg, pipe in models.items():
+        for n_words in lengths:
+            texts = texts_of_length(df, n_words, max(repeats, max(batch_sizes)))
+            predict_proba_batch(pipe, texts[:2])
+            single = []
+            for t in texts[:repeats]:
+                t0 = time.perf_counter()
+                predict_proba_batch(pipe, [t])
+                single.append((time.perf_counter() - t0) * 1000.0)
+            row = {"config": cfg, "words": n_words, "single_ms": _pct(single), "batch_docs_per_s": {}}
+            for bs in batch_sizes:
+                times = []
+                for _ in range(batch_repeats):
+                    t0 = time.perf_counter()
+                    predict_proba_batch(pipe, texts[:bs])
+                    times.append(time.perf_counter() - t0)
+                row["batch_docs_per_s"][str(bs)] = bs / max(float(np.median(times)), 1e-9)
+            rows.append(row)
+            print(f"[bench] latency {cfg:<10} words={n_words:<4} p50={row['single_ms']['p50']:.2f}ms "
+                  f"p99={row['single_ms']['p99']:.2f}ms batch{batch_sizes[-1]}="
+                  f"{row['batch_docs_per_s'][str(batch_sizes[-1])]:.0f}/s", flush=True)
+    return rows
+
+class _AppServer:
+    """The real Flask app serving `model` on a local threaded server."""
+
+    def __init__(self, model: Pipeline):
+        import requests
+        from werkzeug.serving import make_server
+        sys.path.insert(0, str(SRC_DIR.parent))
+        import app as webapp
+
+        self.app, self._requests = webapp, requests
+        webapp.install_model(model, "bench")
+        logging.getLogger("werkzeug").setLevel(logging.ERROR)   # no per-request access log
+        self._srv = make_server("127.0.0.1", 0, webapp.app, threaded=True)
+        threading.Thread(target=self._srv.serve_forever, daemon=True).start()
+        self.base = f"http://127.0.0.1:{self._srv.server_port}"
+        self._local = threading.local()
+
+    def _call(self, args) -> float:
+        path, payload = args
+        s = getattr(self._local, "s", None) or self._requests.Session()
+        self._local.s = s
+        t0 = time.perf_counter()
+        r = s.post(self.base + path, json=payload) if payload is not None else s.get(self.base + path)
+        r.raise_for_status()
+        return (time.perf_counter() - t0) * 1000.0
+
+    def drive(self, calls: list, clients: int) -> tuple:
+        """(req/s, per-request latencies in ms) for `calls` spread over `clients` threads."""
+        self.app._cache.clear()
+        t0 = time.perf_counter()
+        with ThreadPoolExecutor(clients) as ex:
+            lat = list(ex.map(self._call, calls))
+        return len(calls) / (time.perf_counter() - t0), lat
+
+    def close(self) -> None:
+        self._srv.shutdown()
+
+def bench_http(model: Pipeline, df: pd.DataFrame, clients: int = 8, requests_n: int = 400) -> List[dict]:
+    """Drive the real Flask app over HTTP on a local threaded server."""
+    from requests.utils import quote
+    unique = texts_of_length(df, 40, requests_n, seed=RSEED + 1)
+    repeated = unique[:10] * (requests_n // 10)
+    scenarios = {
+        "predict-unique": [("/predict", {"text": t}) for t in unique],
+        "predict-repeated": [("/predict", {"text": t}) for t in repeated],
+        "home-unique": [(f"/?q={quote(t)}", None) for t in unique],
+        "healthz": [("/healthz", None)] * requests_n,
+    }
+    rows = []
+    srv = _AppServer(model)
+    try:
+        for name, calls in scenarios.items():
+            rps, lat = srv.drive(calls, clients)
+            rows.append({"scenario": name, "clients": clients, "requests": len(calls),
+                         "req_per_s": rps, "latency_ms": _pct(lat)})
+            print(f"[bench] http {name:<17} {rps:>8.0f} req/s  "
+                  f"p50={np.median(lat):.1f}ms p99={np.percentile(lat, 99):.1f}ms", flush=True)
+    finally:
+        srv.close()
+    return rows
+
+# name -> (BATCH_MAX_SIZE, BATCH_MAX_WAIT_MS) for the serving batcher comparison
+BATCHING_MODES: Dict[str, tuple] = {
+    "unbatched": (1, 0.0),
+    "batched": (BATCH_MAX_SIZE, BATCH_MAX_WAIT_MS),
+    "batched-wait5ms": (BATCH_MAX_SIZE, 5.0),
+}
+
+def bench_batching(model: Pipeline, df: pd.DataFrame, clients: Sequence[int] = (1, 16),
+                   requests_n: int = 400) -> List[dict]:
+    """/predict throughput with micro-batching off vs on, for a lone client and under
+       concurrency; every text is unique so the prediction cache never hits."""
+    calls = [("/predict", {"text": t}) for t in texts_of_length(df, 40, requests_n, seed=RSEED + 2)]
+    rows = []
+    srv = _AppServer(model)
+    try:
+        for n in clients:
+            for mode, (size, wait_ms) in BATCHING_MODES.items():
+                srv.app.configure_batching(size, wait_ms)
+                rps, lat = srv.drive(calls, n)
+                rows.append({"config": mode, "scenario": f"{n}-clients", "clients": n, "max_size": size,
+                             "max_wait_ms": wait_ms, "req_per_s": rps, "latency_ms": _pct(lat)})
+                print(f"[bench] batching {mode:<15} clients={n:<3} {rps:>8.0f} req/s  "
+                      f"p50={np.median(lat):.1f}ms p99={np.percentile(lat, 99):.1f}ms", flush=True)
+    finally:
+        srv.app.configure_batching(BATCH_MAX_SIZE, BATCH_MAX_WAIT_MS)
+        srv.close()
+    return rows
+
+# ------------------------------
+# Import time of short-lived CLI paths
+# ------------------------------
+# scenario -> (code run with `python -X importtime -c`, modules it must not load,
+#              budget in ms for the summed import time). The module lists are the
+#              portable part of the check; budgets are generous and only catch a
+#              heavy import sneaking back into a light path.
+IMPORT_SCENARIOS: Dict[str, tuple] = {
+    "cli": ("import src.cli.main",
+            ("pandas", "matplotlib", "sklearn", "feedparser", "requests", "joblib"), 300),
+    "models": ("import src.cli.main, src.models.registry",
+               ("pandas", "matplotlib", "sklearn", "joblib"), 300),
+    "fetch": ("import src.data.fetch", ("pandas", "feedparser", "requests"), 300),
+    "predict": ("import src.cli.main; from src.models.predict import load_model, predict_text",
+                ("matplotlib", "sklearn.model_selection", "feedparser", "requests"), 4000),
+}
+
+def _importtime(code: str) -> tuple:
+    """(summed self import time in ms, set of imported module names) for one fresh interpreter."""
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=str(SRC_DIR.parent),
+                          capture_output=True, text=True, check=True)
+    total_us, modules = 0, set()
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, _, name = line[len("import time:"):].split("|")
+        total_us += int(self_us)
+        modules.add(name.strip())
+    return total_us / 1000.0, modules
+
+def bench_imports(repeats: int = 3) -> List[dict]:
+    rows = []
+    for name, (code, forbidden, budget_ms) in IMPORT_SCENARIOS.items():
+        times, modules = [], set()
+        for _ in range(repeats):
+            ms, modules = _importtime(code)
+            times.append(ms)
+        loaded = sorted(m for m in forbidden if m in modules)
+        rows.append({"scenario": name, "import_ms": min(times), "modules": len(modules),
+                     "budget_ms": budget_ms, "forbidden_loaded": loaded})
+        print(f"[bench] imports {name:<8} {min(times):7.1f} ms  modules={len(modules):<5} "
+              f"budget={budget_ms}ms{'  LOADED ' + ','.join(loaded) if loaded else ''}", flush=True)
+    return rows
+
+def check_import_budgets(results: dict) -> List[str]:
+    """Budget violations in a run_suite result: over-budget import time or a heavy
+       module loaded on a path that should not need it."""
+    problems = []
+    for row in results.get("results", {}).get("imports", []):
+        if row["import_ms"] > row["budget_ms"]:
+            problems.append(f"{row['scenario']}: import time {row['import_ms']:.0f} ms > budget {row['budget_ms']} ms")
+        if row["forbidden_loaded"]:
+            problems.append(f"{row['scenario']}: imports {', '.join(row['forbidden_loaded'])}")
+    return problems
+
+# ------------------------------
+# Driver + regression check
+# ------------------------------
+def run_suite(df: pd.DataFrame, scales: Sequence[int] = (1, 4), lengths: Sequence[int] = (8, 32, 128),
+              test_size: float = 0.2, skip: Sequence[str] = (), dataset: str = "",
+              n_features: int = DEFAULT_N_FEATURES) -> dict:
+    out = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(), "sklearn": sklearn.__version__, "numpy": np.__version__,
+            "platform": platform.platform(), "cpu_count": os.cpu_count(),
+            "dataset": str(dataset), "dataset_rows": len(df),
+            "scales": list(scales), "lengths": list(lengths), "n_features": n_features,
+        },
+        "results": {},
+    }
+    res = out["results"]
+    if "imports" not in skip:
+        res["imports"] = bench_imports()
+    if "backends" not in skip:
+        res["backends"] = compare_feature_backends(df, test_size=test_size, n_features=n_features)
+    if "training" not in skip:
+        res["training"] = bench_training(df, scales, test_size, n_features=n_features)
+    models = {}
+    if {"artifacts", "latency", "http", "batching"} - set(skip):
+        models = {cfg: _fit(df, cfg, n_features=n_features) for cfg in VECTORIZER_CONFIGS}
+    if "artifacts" not in skip:
+        res["artifacts"] = bench_artifacts(models)
+    if "latency" not in skip:
+        res["latency"] = bench_latency(models, df, lengths)
+    if "http" not in skip:
+        res["http"] = bench_http(models["union"], df)
+    if "batching" not in skip:
+        res["batching"] = bench_batching(models["union"], df)
+    res["memory"] = {"process_peak_rss_mb": _peak_rss_mb()}
+    return out
+
+def _flatten(obj, prefix="") -> Dict[str, float]:
+    """Numeric leaves keyed by a path that identifies the row (config/scale/words/...)."""
+    flat = {}
+    if isinstance(obj, dict):
+        for k, v in obj.items():
+            flat.update(_flatten(v, f"{prefix}.{k}" if prefix else str(k)))
+    elif isinstance(obj, list):
+        for i, row in enumerate(obj):
+            ident = i
+            if isinstance(row, dict):
+                ident = "/".join(str(row[k]) for k in ("config", "features", "model", "format",
+                                                        "scale", "words", "scenario") if k in row) or i
+            flat.update(_flatten(row, f"{prefix}[{ident}]"))
+    elif isinstance(obj, (int, float)) and not isinstance(obj, bool):
+        flat[prefix] = float(obj)
+    return flat
+
+# Metrics where larger is better; every other timing/size/memory metric is lower-is-better.
+_HIGHER_IS_BETTER = ("accuracy", "macro_f1", "per_s")
+# Gated metrics. Sizes, memory and accuracy are deterministic for a given dataset and
+# use `tolerance`. Timings are gated only as medians of repeated measurements (p50,
+# median batch/HTTP throughput, min-of-n import time) and against the much wider
+# `timing_tolerance`: identical runs on a shared host differ by up to ~1.8x. Tail
+# percentiles, means and one-shot timings (fit_s, featurize_s, backends' load_s)
+# stay in the JSON for reading but are not gated.
+_DETERMINISTIC = ("bytes", "_mb", "accuracy", "macro_f1")
+_TIMINGS = ("p50", "import_ms", "per_s")
+# Settings recorded next to the measurements; they match _TIMINGS but aren't measured.
+_SETTINGS = ("budget_ms",)
+
+def compare_to_baseline(current: dict, baseline: dict, tolerance: float = 0.2,
+                        timing_tolerance: float = 1.0) -> List[str]:
+    """Human-readable regressions of gated metrics: worse by more than `tolerance`
+       (sizes, memory, accuracy) or `timing_tolerance` (timings), as a relative slowdown."""
+    cur, base = _flatten(current.get("results", {})), _flatten(baseline.get("results", {}))
+    regressions = []
+    for key, old in sorted(base.items()):
+        new = cur.get(key)
+        leaf = key.rsplit("]", 1)[-1]   # metric path below the row identifier
+        if new is None or old == 0 or new == 0 or leaf.rsplit(".", 1)[-1] in _SETTINGS:
+            continue
+        if any(t in leaf for t in _DETERMINISTIC):
+            allowed = tolerance
+        elif any(t in leaf for t in _TIMINGS):
+            allowed = timing_tolerance
+        else:
+            continue
+        worse = (old / new if any(t in leaf for t in _HIGHER_IS_BETTER) else new / old) - 1.0
+        if worse > allowed:
+            regressions.append(f"{key}: {old:.4g} → {new:.4g} ({(new - old) / abs(old):+.0%})")
+    return regressions
+
+def save_results(results: dict, path) -> None:
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
@@ -1,35 +1,153 @@
-import argparse
-from ..config import ensure_dirs, DATASET_PATH, MODEL_PATH, CM_PATH, FEEDS
-from ..data.fetch import collect_corpus
-from ..data.io import save_csv, load_csv
-from ..models.train import train_and_evaluate
-from ..models.predict import load_model, predict_text
+# src/cli/main.py
+# Imports are scoped to the subcommand that needs them, so short-lived invocations
+# (`predict --text`, `models`) don't pay for pandas, matplotlib, feedparser or
+# scikit-learn's model selection. Keep module-level imports to config only.
+import argparse, json, os, sys, time
+from pathlib import Path
+from ..config import (SRC_DIR, REPORTS_DIR, ensure_dirs, DATASET_PATH, MODEL_PATH, CM_PATH, FEEDS,
+                      FEATURE_CACHE_DIR, COMPACT_MODEL_PATH, COMPACT_PRUNE_TOL, COMPACT_MAX_PROB_DIFF,
+                      FEED_STATE_PATH, REGISTRY_DIR, FEATURE_BACKENDS, DEFAULT_N_FEATURES, BENCH_SECTIONS,
+                      CORPUS_STORE_PATH, REGISTRY_KEEP, STREAM_SHUFFLE_ROWS)
 
 def _parse_args():
     p = argparse.ArgumentParser(description="Task 2 — BBC Subject Classification")
-    p.add_argument("mode", choices=["train", "predict"], help="train/evaluate or predict")
-    p.add_argument("--dataset", default=DATASET_PATH, help="CSV dataset path")
+    p.add_argument("mode", choices=["train", "predict", "bench", "export", "models", "serve", "corpus"],
+                   help="train/evaluate, predict, bench (performance suite), "
+                        "export (compact float32 artifact), models (list/activate/rollback registry versions), "
+                        "serve (pre-forked multi-worker web app), "
+                        "or corpus (Parquet corpus store: import/export CSV, compaction, partition stats)")
+    p.add_argument("--dataset", default=DATASET_PATH,
+                   help="Corpus: CSV file or Parquet store directory (*.parquet, needs pyarrow)")
     p.add_argument("--model",   default=MODEL_PATH,   help="Model path")
     p.add_argument("--cm",      default=CM_PATH,      help="Confusion matrix image path")
     p.add_argument("--test-size", type=float, default=0.2, help="Test split (0–1)")
+    p.add_argument("--val-size", type=float, default=0.2,
+                   help="(train) Share of the training split held out to select the grid (0–1)")
     p.add_argument("--no-fetch", action="store_true",
                    help="(train) Skip RSS fetch and reuse existing dataset")
     p.add_argument("--text", help="Text to classify (predict mode). Omit for interactive loop.")
-    return p.parse_args()
+    p.add_argument("--features", choices=FEATURE_BACKENDS, default="union",
+                   help="(train) Feature backend: TF-IDF vocabulary union or stateless hashing")
+    p.add_argument("--n-features", type=int, default=DEFAULT_N_FEATURES,
+                   help="(train/bench) Hashed columns per block for --features hashing")
+    p.add_argument("--cv", type=int, default=0, metavar="K",
+                   help="(train) Select the model by stratified K-fold CV and refit on all rows")
+    p.add_argument("--n-jobs", type=int, default=-1,
+                   help="(train) Parallel workers for candidate models / CV folds (-1 = all cores)")
+    p.add_argument("--no-cache", action="store_true",
+                   help="(train) Don't read/write the feature matrix cache")
+    p.add_argument("--stream", action="store_true",
+                   help="(train) Out-of-core training: read --dataset (.csv/.jsonl/store) in chunks and partial_fit")
+    p.add_argument("--chunk-size", type=int, default=10000, help="(train --stream) Rows per chunk")
+    p.add_argument("--holdout", help="(train --stream) Separate .csv/.jsonl evaluation stream "
+                                     "(default: hash-split --test-size of --dataset)")
+    p.add_argument("--epochs", type=int, default=1, help="(train --stream) Passes over the dataset")
+    p.add_argument("--shuffle-rows", type=int, default=STREAM_SHUFFLE_ROWS,
+                   help="(train --stream) Shuffle buffer between reader and partial_fit (0 = file order)")
+    p.add_argument("--registry", default=REGISTRY_DIR, help="Model registry directory")
+    p.add_argument("--no-publish", action="store_true",
+                   help="(train) Only write --model; don't publish a new registry version")
+    p.add_argument("--publish", action="store_true",
+                   help="(export) Publish the compact artifact as a new registry version")
+    p.add_argument("--activate", metavar="VERSION", help="(models) Make VERSION the current model")
+    p.add_argument("--rollback", action="store_true", help="(models) Re-activate the previous version")
+    p.add_argument("--prune", action="store_true", help="(models) Delete versions beyond --keep")
+    p.add_argument("--keep", type=int, default=REGISTRY_KEEP,
+                   help="Registry versions to keep on publish / models --prune, besides CURRENT and "
+                        "its rollback target (0 = keep all)")
+    p.add_argument("--host", default=os.getenv("HOST", "127.0.0.1"), help="(serve) Bind address")
+    p.add_argument("--port", type=int, default=int(os.getenv("PORT", "5000")), help="(serve) Bind port")
+    p.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                   help="(serve) Worker processes forked from the master (default: CPU count)")
+    p.add_argument("--graceful-timeout", type=float, default=30.0,
+                   help="(serve) Seconds a worker may take to finish in-flight requests on stop/restart")
+    p.add_argument("--compact-out", default=COMPACT_MODEL_PATH,
+                   help="(export) Output directory for the compact artifact")
+    p.add_argument("--prune-tol", type=float, default=COMPACT_PRUNE_TOL,
+                   help="(export) Also drop features whose weights lie within this fraction of the block's "
+                        "largest weight (lossy, checked against the pipeline; 0 = only prune features "
+                        "unseen in training, exact)")
+    p.add_argument("--store", default=CORPUS_STORE_PATH, help="(corpus) Parquet corpus store directory")
+    p.add_argument("--import-csv", metavar="CSV", help="(corpus) Append new rows of a corpus CSV to --store")
+    p.add_argument("--export-csv", metavar="CSV", help="(corpus) Write --store out as one CSV")
+    p.add_argument("--compact", action="store_true",
+                   help="(corpus) Merge the small part files of each partition of --store")
+    p.add_argument("--bench-out", help="(bench) JSON results path (default: reports/bench/bench-<timestamp>.json)")
+    p.add_argument("--bench-scales", default="1,4",
+                   help="(bench) Comma-separated synthetic scale-up factors of the dataset")
+    p.add_argument("--bench-lengths", default="8,32,128", help="(bench) Comma-separated text lengths in words")
+    p.add_argument("--bench-skip", default="", help=f"(bench) Comma-separated sections to skip: {','.join(BENCH_SECTIONS)}")
+    p.add_argument("--bench-baseline", help="(bench) Earlier results JSON; exit 1 on >--bench-tolerance regressions")
+    p.add_argument("--bench-tolerance", type=float, default=0.2,
+                   help="(bench) Allowed relative regression of sizes, memory and accuracy")
+    p.add_argument("--bench-timing-tolerance", type=float, default=1.0,
+                   help="(bench) Allowed relative slowdown of median timings (1.0 = twice as slow)")
+    args = p.parse_args()
+    if args.cv and args.cv < 2:
+        p.error(f"--cv needs at least 2 folds (got {args.cv}); omit it for a single hold-out split")
+    return args
 
 def cmd_train(args):
+    from ..data.corpus import append_new, feed_state_path_for
+    from ..data.fetch import collect_corpus, make_session, load_feed_state, save_feed_state
+    from ..data.io import load_dataset
+    from ..data.store import fingerprint, is_store
+    from ..features.cache import dataset_hash
+    from ..models.registry import file_hash, publish
     ensure_dirs()
     if args.no_fetch:
-        df = load_csv(args.dataset)
+        df = None if args.stream else load_dataset(args.dataset)
     else:
         print("Fetching BBC RSS…")
-        df = collect_corpus(FEEDS)
-        print("Class counts:", df["label"].value_counts().to_dict())
-        save_csv(df, args.dataset)
-        print(f"Saved dataset → {args.dataset}")
-    train_and_evaluate(df, test_size=args.test_size, model_out=args.model, cm_out=args.cm)
+        state_path = FEED_STATE_PATH or feed_state_path_for(args.dataset)
+        # validators are only valid for the rows already in this dataset
+        state = load_feed_state(state_path) if os.path.exists(args.dataset) else {}
+        fetched = collect_corpus(FEEDS, session=make_session(len(FEEDS)), state=state, allow_empty=True)
+        new = append_new(fetched, args.dataset)
+        if not os.path.exists(args.dataset):   # every feed failed and there is nothing from earlier runs
+            raise RuntimeError("No documents fetched. Check network/SSL or try http feeds.")
+        save_feed_state(state, state_path)
+        print("New per class:", new["label"].value_counts().to_dict())
+        print(f"Appended {len(new)} new documents → {args.dataset}")
+        df = None if args.stream else load_dataset(args.dataset)
+
+    t0 = time.perf_counter()
+    if args.stream:
+        from ..models.incremental import train_incremental
+        _, name, acc = train_incremental(str(args.dataset), model_out=args.model, cm_out=args.cm,
+                                         test_size=args.test_size, chunk_size=args.chunk_size,
+                                         n_features=args.n_features, holdout=args.holdout, epochs=args.epochs,
+                                         shuffle_rows=args.shuffle_rows)
+    elif args.cv:
+        from ..models.train import train_cv
+        _, name, acc = train_cv(df, args.cv, model_out=args.model, cm_out=args.cm,
+                                features=args.features, n_features=args.n_features, n_jobs=args.n_jobs,
+                                cache_dir=None if args.no_cache else FEATURE_CACHE_DIR)
+    else:
+        from ..models.train import train_and_evaluate
+        _, name, acc = train_and_evaluate(df, test_size=args.test_size, model_out=args.model, cm_out=args.cm,
+                                          features=args.features, n_features=args.n_features, n_jobs=args.n_jobs,
+                                          cache_dir=None if args.no_cache else FEATURE_CACHE_DIR,
+                                          val_size=args.val_size)
+    train_s = time.perf_counter() - t0
+
+    if not args.no_publish:
+        meta = {
+            "model": name,
+            "accuracy": float(acc),
+            "evaluation": ("stream-holdout" if args.stream else
+                           f"cv{args.cv}" if args.cv else f"holdout{args.test_size}"),
+            "features": "streaming-hashing" if args.stream else args.features,
+            "train_seconds": round(train_s, 3),
+            "dataset": str(args.dataset),
+            "dataset_hash": (dataset_hash(df) if df is not None else
+                             fingerprint(args.dataset) if is_store(args.dataset) else file_hash(args.dataset)),
+        }
+        version = publish(args.registry, args.model, meta, keep=args.keep)
+        print(f"Published {version} → {args.registry} (now current)")
 
 def cmd_predict(args):
+    from ..models.predict import load_model, predict_text
     ensure_dirs()
     model = load_model(args.model)
     if args.text:
@@ -45,10 +163,141 @@ def cmd_predict(args):
             print("bye"); break
         print(predict_text(model, s))
 
+def cmd_bench(args):
+    from ..bench.suite import run_suite, save_results, compare_to_baseline, check_import_budgets
+    from ..data.io import load_dataset
+    ensure_dirs()
+    df = load_dataset(args.dataset)
+    results = run_suite(df, scales=[int(x) for x in args.bench_scales.split(",") if x],
+                        lengths=[int(x) for x in args.bench_lengths.split(",") if x],
+                        test_size=args.test_size, skip=[x for x in args.bench_skip.split(",") if x],
+                        dataset=args.dataset, n_features=args.n_features)
+    out = args.bench_out or REPORTS_DIR / "bench" / f"bench-{time.strftime('%Y%m%d-%H%M%S')}.json"
+    save_results(results, out)
+    print(f"Saved benchmark → {out}")
+    over = check_import_budgets(results)
+    for r in over:
+        print(f"[import-budget] {r}")
+    if args.bench_baseline:
+        with open(args.bench_baseline, "r", encoding="utf-8") as f:
+            regressions = compare_to_baseline(results, json.load(f), args.bench_tolerance,
+                                              args.bench_timing_tolerance)
+        for r in regressions:
+            print(f"[regression] {r}")
+        if regressions:
+            sys.exit(1)
+        print(f"No regressions beyond {args.bench_tolerance:.0%} (timings {args.bench_timing_tolerance:.0%}) "
+              f"vs {args.bench_baseline}")
+    if over:
+        sys.exit(1)
+
+def cmd_export(args):
+    from ..data.io import load_dataset
+    from ..models.artifact import export_compact, load_compact, compare_models, with_unseen_tokens
+    from ..models.predict import load_model
+    from ..models.registry import artifact_path, current_version, file_hash, publish, read_meta
+    ensure_dirs()
+    model = load_model(args.model)
+    counts = export_compact(model, args.compact_out, prune_tol=args.prune_tol)
+    size = sum(f.stat().st_size for f in Path(args.compact_out).iterdir())
+    print(f"Kept {counts['kept']}/{counts['total']} features (prune_tol={args.prune_tol})")
+    print(f"Size: {Path(args.model).stat().st_size / 1024:.0f} KB → {size / 1024:.0f} KB")
+    if Path(args.dataset).exists():
+        texts = load_dataset(args.dataset, columns=("text",))["text"].astype(str).tolist()
+        texts += with_unseen_tokens(texts)
+        fid = compare_models(model, load_compact(args.compact_out), texts)
+        print(f"Agreement on {len(texts)} dataset rows (half with unseen words added): {fid['agreement']:.3f} "
+              f"(max |Δprob| {fid['max_abs_prob_diff']:.4f})")
+        # pruning unseen features alone must not change predictions (float32 rounding aside);
+        # lossy pruning may move probabilities by up to COMPACT_MAX_PROB_DIFF
+        if args.prune_tol == 0 and (fid["agreement"] < 1.0 or fid["max_abs_prob_diff"] > 1e-4):
+            sys.exit("Compact artifact disagrees with the pipeline; not publishing it.")
+        if args.prune_tol > 0 and fid["max_abs_prob_diff"] > COMPACT_MAX_PROB_DIFF:
+            sys.exit(f"Pruning moved probabilities by more than {COMPACT_MAX_PROB_DIFF}; "
+                     f"lower --prune-tol (now {args.prune_tol}).")
+    print(f"Saved compact model → {args.compact_out}")
+    if args.publish:
+        # inherit metrics when exporting the artifact of the current version
+        cur = current_version(args.registry)
+        meta = {"model": type(model.named_steps.get("clf")).__name__}
+        if cur and Path(args.model).is_file():
+            cur_path = artifact_path(args.registry, cur)
+            if cur_path.is_file() and file_hash(cur_path) == file_hash(args.model):
+                meta = dict(read_meta(args.registry, cur), source_version=cur)
+        meta.update(format="compact", prune_tol=args.prune_tol, features_kept=counts["kept"])
+        version = publish(args.registry, args.compact_out, meta, keep=args.keep)
+        print(f"Published {version} → {args.registry} (now current)")
+    else:
+        print(f"Serve it with: MODEL_PATH={args.compact_out} python app.py")
+
+def cmd_models(args):
+    from ..models.registry import activate, current_version, list_versions, prune, read_meta, rollback
+    if args.activate:
+        activate(args.registry, args.activate)
+        print(f"Activated {args.activate}")
+    elif args.rollback:
+        print(f"Rolled back to {rollback(args.registry)}")
+    if args.prune:
+        removed = prune(args.registry, args.keep)
+        print(f"Pruned {len(removed)} versions{': ' + ', '.join(removed) if removed else ''}")
+    cur = current_version(args.registry)
+    for v in list_versions(args.registry):
+        m = read_meta(args.registry, v)
+        print(f"{'*' if v == cur else ' '} {v}  {m.get('published_at', ''):<24} {m.get('model', ''):<14} "
+              f"acc={m.get('accuracy', float('nan')):.3f}  {m.get('evaluation', '')}  "
+              f"{m.get('artifact', '')}  data={str(m.get('dataset_hash', ''))[:12]}")
+    print("Reload a running server with: curl -X POST localhost:5000/reload")
+
+def cmd_corpus(args):
+    from ..data.store import compact, count_rows, export_csv, import_csv
+    ensure_dirs()
+    if args.import_csv:
+        t0 = time.perf_counter()
+        added = import_csv(args.import_csv, args.store)
+        print(f"Imported {added} new rows from {args.import_csv} → {args.store} "
+              f"({time.perf_counter() - t0:.1f}s)")
+    if args.export_csv:
+        n = export_csv(args.store, args.export_csv)
+        print(f"Exported {n} rows → {args.export_csv}")
+    if args.compact and Path(args.store).is_dir():
+        t0 = time.perf_counter()
+        c = compact(args.store)
+        print(f"Compacted {c['partitions']} partitions: {c['files_before']} → {c['files_after']} files "
+              f"({time.perf_counter() - t0:.1f}s)")
+    stats = count_rows(args.store) if Path(args.store).is_dir() else None
+    if stats is None or stats.empty:
+        print(f"{args.store}: empty. Import a CSV with: corpus --import-csv {DATASET_PATH}")
+        return
+    print(stats.to_string(index=False))
+    by_label = stats.groupby("label")["rows"].sum().to_dict()
+    print(f"Total: {int(stats['rows'].sum())} rows in {int(stats['files'].sum())} files  {by_label}")
+    print(f"Train on it with: --dataset {args.store}")
+
+def cmd_serve(args):
+    import importlib
+    from ..serving.prefork import serve_prefork
+    ensure_dirs()
+    sys.path.insert(0, str(SRC_DIR.parent))   # app.py lives next to src/
+    webapp = importlib.import_module("app")
+    webapp.startup()                           # load + warm up once, before forking
+    webapp.app.config["PREFORK_MASTER_PID"] = os.getpid()
+    serve_prefork(webapp.app, args.host, args.port, args.workers,
+                  on_reload=webapp.reload_now, graceful_timeout=args.graceful_timeout)
+
 def main():
     args = _parse_args()
     if args.mode == "train":
         cmd_train(args)
+    elif args.mode == "bench":
+        cmd_bench(args)
+    elif args.mode == "export":
+        cmd_export(args)
+    elif args.mode == "models":
+        cmd_models(args)
+    elif args.mode == "serve":
+        cmd_serve(args)
+    elif args.mode == "corpus":
+        cmd_corpus(args)
     else:
         cmd_predict(args)
 
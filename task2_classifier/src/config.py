@@ -7,9 +7,21 @@ FEEDS = {
     "Business": "https://feeds.bbci.co.uk/news/business/rss.xml",
     "Health":   "https://feeds.bbci.co.uk/news/health/rss.xml",
 }
+# Fetch from another server instead, e.g. the local stand-in: python -m src.data.feedserver
+FEED_BASE_URL = os.getenv("FEED_BASE_URL")
+if FEED_BASE_URL:
+    FEEDS = {label: f"{FEED_BASE_URL.rstrip('/')}/{label.lower()}.xml" for label in FEEDS}
 LABELS = ["Politics", "Business", "Health"]
 RSEED = 42
 
+# Feature backends (src/features/vectorizer.py); kept here so the CLI can list them
+# without importing scikit-learn.
+FEATURE_BACKENDS = ("union", "hashing")
+DEFAULT_N_FEATURES = 2 ** 18
+# train --stream: rows held in the shuffle buffer between the reader and partial_fit
+STREAM_SHUFFLE_ROWS = int(os.getenv("STREAM_SHUFFLE_ROWS", "100000"))
+BENCH_SECTIONS = ("backends", "training", "artifacts", "latency", "http", "batching", "imports")
+
 # Anchor to src/
 SRC_DIR = Path(__file__).resolve().parent            # .../project-name/src
 
@@ -20,10 +32,36 @@ REPORTS_DIR = SRC_DIR / "reports"
 
 # Files (allow optional env override if you ever want)
 DATASET_PATH = Path(os.getenv("DATASET_PATH", str(DATA_DIR / "task2_corpus.csv")))
-MODEL_PATH   = Path(os.getenv("MODEL_PATH",   str(MODELS_DIR / "task2_model.joblib")))
+CORPUS_STORE_PATH = Path(os.getenv("CORPUS_STORE_PATH", str(DATA_DIR / "task2_corpus.parquet")))  # needs pyarrow
+MODEL_PATH   = Path(os.getenv("MODEL_PATH",   str(MODELS_DIR / "task2_model.joblib")))  # .joblib or compact dir
+REGISTRY_DIR = Path(os.getenv("REGISTRY_DIR", str(MODELS_DIR / "registry")))  # versioned models + CURRENT pointer
+REGISTRY_KEEP = int(os.getenv("REGISTRY_KEEP", "5"))  # newest versions kept on publish (+ CURRENT, previous); 0 = all
+COMPACT_MODEL_PATH = Path(os.getenv("COMPACT_MODEL_PATH", str(MODELS_DIR / "task2_model.compact")))
+# export: drop features whose weights are within this fraction of the block's largest one,
+# and refuse the artifact if any probability then moves by more than COMPACT_MAX_PROB_DIFF
+COMPACT_PRUNE_TOL = float(os.getenv("COMPACT_PRUNE_TOL", "0.05"))
+COMPACT_MAX_PROB_DIFF = float(os.getenv("COMPACT_MAX_PROB_DIFF", "0.05"))
 CM_PATH      = Path(os.getenv("CM_PATH",      str(REPORTS_DIR / "task2_cm.png")))
+# ETag/Last-Modified per feed; default is a sidecar next to --dataset (see data/corpus.py)
+FEED_STATE_PATH = Path(os.environ["FEED_STATE_PATH"]) if os.getenv("FEED_STATE_PATH") else None
+FEATURE_CACHE_DIR = Path(os.getenv("FEATURE_CACHE_DIR", str(DATA_DIR / "cache")))  # .npz feature matrices
+FEATURE_CACHE_MAX_MB = float(os.getenv("FEATURE_CACHE_MAX_MB", "512"))  # least recently used evicted; 0 = no cap
+
+# Serving: micro-batching of concurrent predict calls (BATCH_MAX_SIZE=1 disables it).
+# With a wait of 0 a batch is whatever queued up while the previous one ran, so a lone
+# request is never held back (the bench "batching" section compares settings).
+BATCH_MAX_SIZE    = int(os.getenv("BATCH_MAX_SIZE", "32"))
+BATCH_MAX_WAIT_MS = float(os.getenv("BATCH_MAX_WAIT_MS", "0"))
+
+# Serving: LRU/TTL cache of (model version, normalized text hash) -> probs (size 0 disables it)
+PRED_CACHE_SIZE  = int(os.getenv("PRED_CACHE_SIZE", "10000"))
+PRED_CACHE_TTL_S = float(os.getenv("PRED_CACHE_TTL_S", "3600"))
+
+# Serving: per-stage inference timing for /metrics (vectorizer blocks, hstack, classifier)
+PROFILE_STAGES = os.getenv("PROFILE_STAGES", "1").lower() not in ("0", "false", "no")
 
 def ensure_dirs():
     DATA_DIR.mkdir(parents=True, exist_ok=True)
     MODELS_DIR.mkdir(parents=True, exist_ok=True)
     REPORTS_DIR.mkdir(parents=True, exist_ok=True)
+    FEATURE_CACHE_DIR.mkdir(parents=True, exist_ok=True)
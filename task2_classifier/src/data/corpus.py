@@ -0,0 +1,88 @@
+# src/data/corpus.py
+# Persistent, append-only training corpus. Each document is keyed on a hash of its
+# link (or its text when there is no link); the keys live in a sidecar file next to
+# the dataset so new fetches are deduplicated without re-reading the whole corpus.
+# The dataset is either a CSV or a Parquet store directory (see data/store.py).
+# The feeds' ETag/Last-Modified validators live next to it too: they only say what
+# *this* dataset has already seen, so a new or deleted dataset starts without them.
+import hashlib, os
+from pathlib import Path
+from typing import Set
+import pandas as pd
+
+CORPUS_COLUMNS = ["label", "text", "title", "link", "source", "fetched_at"]
+
+def doc_key(link: str, text: str) -> str:
+    link = (link or "").strip() if isinstance(link, str) else ""
+    basis = "link:" + link if link else "text:" + " ".join(str(text).lower().split())
+    return hashlib.sha1(basis.encode("utf-8")).hexdigest()
+
+def _is_store(dataset_path) -> bool:
+    from .store import is_store
+    return is_store(dataset_path)
+
+def keys_path_for(dataset_path) -> Path:
+    p = Path(dataset_path)
+    if _is_store(p):
+        return p / "_keys"   # "_" files are skipped by Parquet dataset readers
+    return p.with_name(p.name + ".keys")
+
+def feed_state_path_for(dataset_path) -> Path:
+    p = Path(dataset_path)
+    if _is_store(p):
+        return p / "_feed_state.json"
+    return p.with_name(p.name + ".feeds.json")
+
+def _iter_key_columns(dataset_path):
+    if _is_store(dataset_path):
+        from .store import iter_batches
+        yield from iter_batches(dataset_path, ("link", "text"), 50000)
+    else:
+        yield from pd.read_csv(dataset_path, usecols=lambda c: c in ("link", "text"), chunksize=50000)
+
+def load_keys(dataset_path) -> Set[str]:
+    """Known document keys; bootstrapped once from the dataset if the sidecar is missing."""
+    kp = keys_path_for(dataset_path)
+    if kp.exists() and not os.path.exists(dataset_path):
+        kp.unlink()   # left over from a deleted dataset: its rows are gone, so are its keys
+    if kp.exists():
+        with open(kp, "r", encoding="utf-8") as f:
+            return {line.strip() for line in f if line.strip()}
+    keys: Set[str] = set()
+    if os.path.exists(dataset_path):
+        for chunk in _iter_key_columns(dataset_path):
+            links = chunk["link"] if "link" in chunk else [""] * len(chunk)
+            keys.update(doc_key(l, t) for l, t in zip(links, chunk["text"]))
+        with open(kp, "w", encoding="utf-8") as f:
+            f.writelines(k + "\n" for k in sorted(keys))
+    return keys
+
+def append_new(df: pd.DataFrame, dataset_path) -> pd.DataFrame:
+    """Append rows of `df` not already in the corpus to the dataset (CSV or Parquet
+       store) and their keys to the sidecar. Returns the rows that were appended."""
+    if df.empty:
+        return df
+    known = load_keys(dataset_path)
+    keys = [doc_key(l, t) for l, t in zip(df["link"], df["text"])]
+    fresh, fresh_keys = [], []
+    for i, k in enumerate(keys):
+        if k not in known:
+            known.add(k)
+            fresh.append(i)
+            fresh_keys.append(k)
+    new = df.iloc[fresh]
+    if new.empty:
+        return new
+
+    if _is_store(dataset_path):
+        from .store import append
+        append(new, dataset_path)
+    elif os.path.exists(dataset_path) and os.path.getsize(dataset_path) > 0:
+        # keep the on-disk header (older corpora have no fetched_at column)
+        header = pd.read_csv(dataset_path, nrows=0).columns.tolist()
+        new.reindex(columns=header).to_csv(dataset_path, mode="a", header=False, index=False)
+    else:
+        new.reindex(columns=CORPUS_COLUMNS).to_csv(dataset_path, index=False)
+    with open(keys_path_for(dataset_path), "a", encoding="utf-8") as f:
+        f.writelines(k + "\n" for k in fresh_keys)
+    return new
@@ -0,0 +1,157 @@
+# src/data/feedserver.py
+# Local stand-in for the BBC feeds, for exercising the conditional-GET / append path
+# without the network. Serves one RSS document per label at /<label>.xml built from
+# corpus rows, with a strong ETag and Last-Modified, and answers 304 when the
+# client's If-None-Match / If-Modified-Since still match.
+#
+#   python -m src.data.feedserver --port 8765 --items 10 --grow-every 30
+#   FEED_BASE_URL=http://127.0.0.1:8765 python -m src.cli.main train --dataset /tmp/corpus.csv
+#
+# publish() adds entries to a feed (new ETag); GET /_stats returns {"200": n, "304": n}.
+import argparse, hashlib, json, threading, time
+from email.utils import formatdate, parsedate_to_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List
+from xml.sax.saxutils import escape
+
+class FeedServer:
+    def __init__(self, host: str = "127.0.0.1", port: int = 0):
+        self.items: Dict[str, List[dict]] = {}
+        self.modified: Dict[str, float] = {}
+        self.hits = {"200": 0, "304": 0}
+        self._lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer((host, port), self._handler())
+        self.httpd.daemon_threads = True
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def feeds(self) -> Dict[str, str]:
+        """{label: url}, ready for collect_corpus."""
+        return {label: f"{self.base_url}/{label.lower()}.xml" for label in self.items}
+
+    def publish(self, label: str, entries: List[dict]) -> None:
+        """Add entries ({"title", "summary", "link"}) to the front of a feed."""
+        with self._lock:
+            self.items[label] = list(entries) + self.items.get(label, [])
+            # Last-Modified has 1 s resolution; keep it strictly increasing per feed
+            self.modified[label] = max(int(time.time()), self.modified.get(label, 0) + 1)
+
+    def _render(self, label: str):
+        with self._lock:
+            entries, modified = list(self.items[label]), self.modified[label]
+        body = ["<?xml version='1.0' encoding='UTF-8'?>", "<rss version='2.0'><channel>",
+                f"<title>{escape(label)}</title>"]
+        for e in entries:
+            body.append(f"<item><title>{escape(e['title'])}</title>"
+                        f"<description>{escape(e['summary'])}</description>"
+                        f"<link>{escape(e['link'])}</link></item>")
+        body.append("</channel></rss>")
+        raw = "\n".join(body).encode("utf-8")
+        return raw, '"' + hashlib.sha1(raw).hexdigest()[:16] + '"', modified
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path == "/_stats":
+                    return self._send(200, json.dumps(server.hits).encode("utf-8"), "application/json")
+                label = next((l for l in server.items if self.path == f"/{l.lower()}.xml"), None)
+                if label is None:
+                    return self._send(404, b"not found", "text/plain")
+                raw, etag, modified = server._render(label)
+                headers = {"ETag": etag, "Last-Modified": formatdate(modified, usegmt=True)}
+                code = 304 if self._not_modified(etag, modified) else 200
+                with server._lock:
+                    server.hits[str(code)] += 1
+                if code == 304:
+                    return self._send(304, b"", None, headers)
+                self._send(200, raw, "application/rss+xml", headers)
+
+            def _not_modified(self, etag, modified) -> bool:
+                inm = self.headers.get("If-None-Match")
+                if inm is not None:   # If-None-Match takes precedence (RFC 9110)
+                    return etag in [t.strip() for t in inm.split(",")]
+                ims = self.headers.get("If-Modified-Since")
+                try:
+                    return ims is not None and int(modified) <= parsedate_to_datetime(ims).timestamp()
+                except (TypeError, ValueError):
+                    return False
+
+            def _send(self, code, body, ctype, headers=None):
+                self.send_response(code)
+                for k, v in (headers or {}).items():
+                    self.send_header(k, v)
+                if ctype:
+                    self.send_header("Content-Type", ctype)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, fmt, *args):
+                pass
+
+        return Handler
+
+    def start(self) -> "FeedServer":
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+def entries_from_corpus(df, label: str) -> List[dict]:
+    """Feed entries for one label; corpus text is "title. summary", so split it back."""
+    out = []
+    rows = df[df["label"] == label]
+    for i, (title, text, link) in enumerate(zip(rows["title"].fillna(""), rows["text"].astype(str), rows["link"])):
+        title = str(title)
+        summary = text[len(title):].lstrip(". ") if title and text.startswith(title) else text
+        out.append({"title": title, "summary": summary,
+                    "link": link if isinstance(link, str) and link else f"local://{label}/{i}"})
+    return out
+
+def main():
+    import pandas as pd
+    from ..config import DATASET_PATH
+    p = argparse.ArgumentParser(description="Serve corpus rows as local RSS feeds with ETag/304 support")
+    p.add_argument("--dataset", default=DATASET_PATH, help="Corpus CSV the feed entries come from")
+    p.add_argument("--host", default="127.0.0.1")
+    p.add_argument("--port", type=int, default=8765)
+    p.add_argument("--items", type=int, default=10, help="Entries per feed at start")
+    p.add_argument("--grow-every", type=float, default=0,
+                   help="Seconds between publishing one more entry per feed (0 = static feeds)")
+    args = p.parse_args()
+
+    df = pd.read_csv(args.dataset)
+    if "link" not in df:
+        df["link"] = ""
+    if "title" not in df:
+        df["title"] = ""
+    pool = {label: entries_from_corpus(df, label) for label in sorted(df["label"].dropna().unique())}
+    srv = FeedServer(args.host, args.port)
+    for label, entries in pool.items():
+        srv.publish(label, entries[:args.items])
+    srv.start()
+    print(f"[feedserver] {srv.base_url}  feeds: {', '.join(srv.feeds().values())}", flush=True)
+    print(f"[feedserver] point train at it with FEED_BASE_URL={srv.base_url}", flush=True)
+    shown = {label: args.items for label in pool}
+    try:
+        while True:
+            time.sleep(args.grow_every or 3600)
+            if not args.grow_every:
+                continue
+            for label, entries in pool.items():
+                if shown[label] < len(entries):
+                    srv.publish(label, [entries[shown[label]]])
+                    shown[label] += 1
+            print(f"[feedserver] published one entry per feed  hits={srv.hits}", flush=True)
+    except KeyboardInterrupt:
+        srv.stop()
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,15 @@
 # src/data/fetch.py
-import re, time
-from typing import Dict, List
-import requests, feedparser, pandas as pd
+# requests, feedparser and pandas are imported where they are used: the feed-state
+# helpers and clean_html are needed by code paths that never touch the network.
+from __future__ import annotations
+import json, os, re, time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    import pandas as pd
+    import requests
 
 UA = "Mozilla/5.0 (Macintosh; Intel Mac OS X) AppleWebKit/537.36 (KHTML, like Gecko) Python-requests feed fetcher"
 
@@ -11,7 +19,42 @@ def clean_html(s: str) -> str:
     s = re.sub(r"\s+", " ", s)
     return s.strip()
 
-def _get_feed_bytes(url: str, timeout: int = 10) -> bytes:
+def make_session(pool_size: int = 8) -> requests.Session:
+    """One keep-alive connection pool shared by all feed fetches."""
+    import requests
+    from requests.adapters import HTTPAdapter
+    s = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    s.mount("http://", adapter)
+    s.mount("https://", adapter)
+    s.headers["User-Agent"] = UA
+    return s
+
+# ------------------------------
+# Conditional GET state (ETag / Last-Modified per feed URL)
+# ------------------------------
+def load_feed_state(path) -> Dict[str, dict]:
+    if not path or not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def save_feed_state(state: Dict[str, dict], path) -> None:
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=2, sort_keys=True)
+    os.replace(tmp, path)
+
+def _get_feed_bytes(url: str, timeout: int = 10, session: Optional[requests.Session] = None,
+                    validators: Optional[dict] = None) -> Tuple[Optional[bytes], dict]:
+    """Return (body, validators); body is None when the server answered 304 Not Modified."""
+    session = session or make_session(1)
+    headers = {}
+    if validators:
+        if validators.get("etag"):
+            headers["If-None-Match"] = validators["etag"]
+        if validators.get("last_modified"):
+            headers["If-Modified-Since"] = validators["last_modified"]
     # try https, then http fallback if caller passed https
     urls = [url]
     if url.startswith("https://"):
@@ -19,21 +62,34 @@ def _get_feed_bytes(url: str, timeout: int = 10) -> bytes:
     last_err = None
     for u in urls:
         try:
-            r = requests.get(u, headers={"User-Agent": UA}, timeout=timeout, allow_redirects=True)
+            r = session.get(u, headers=headers, timeout=timeout, allow_redirects=True)
+            if r.status_code == 304:
+                return None, dict(validators or {})
             r.raise_for_status()
-            return r.content
+            new = {"etag": r.headers.get("ETag"), "last_modified": r.headers.get("Last-Modified")}
+            return r.content, {k: v for k, v in new.items() if v}
         except Exception as e:
             last_err = e
             print(f"[fetch] GET {u} -> ERROR: {e}", flush=True)
-            time.sleep(0.5)
     raise last_err
 
-def fetch_feed(label: str, url: str, timeout: int = 10, verbose: bool = True) -> List[dict]:
+def fetch_feed(label: str, url: str, timeout: int = 10, verbose: bool = True,
+               session: Optional[requests.Session] = None, state: Optional[Dict[str, dict]] = None) -> List[dict]:
+    """Fetch and parse one feed. If `state` is given it is used for a conditional GET
+       and updated in place; an unchanged feed (304) yields no documents."""
     if verbose: print(f"[fetch] {label}: {url}", flush=True)
-    raw = _get_feed_bytes(url, timeout=timeout)
+    raw, validators = _get_feed_bytes(url, timeout=timeout, session=session,
+                                      validators=(state or {}).get(url))
+    if state is not None:
+        state[url] = validators
+    if raw is None:
+        if verbose: print(f"[fetch] {label}: not modified", flush=True)
+        return []
+    import feedparser
     d = feedparser.parse(raw)
     n = len(getattr(d, "entries", []))
     if verbose: print(f"[fetch] {label}: entries={n}", flush=True)
+    fetched_at = datetime.now(timezone.utc).strftime("%Y-%m-%d")
     docs = []
     for e in d.entries:
         title = clean_html(getattr(e, "title", ""))
@@ -41,34 +97,43 @@ def fetch_feed(label: str, url: str, timeout: int = 10, verbose: bool = True) ->
         link = getattr(e, "link", "")
         text = (title + ". " + summary).strip()
         if len(text.split()) >= 8:
-            docs.append({"label": label, "text": text, "title": title, "link": link, "source": url})
+            docs.append({"label": label, "text": text, "title": title, "link": link, "source": url,
+                         "fetched_at": fetched_at})
     return docs
 
-def collect_corpus(feeds: Dict[str, str], timeout: int = 10, retries: int = 1, verbose: bool = True) -> pd.DataFrame:
-    all_docs = []
-    for label, url in feeds.items():
-        last_err = None
-        for attempt in range(1, retries + 2):
-            try:
-                if verbose: print(f"[collect] {label} attempt {attempt}/{retries+1}", flush=True)
-                all_docs.extend(fetch_feed(label, url, timeout=timeout, verbose=verbose))
-                break
-            except Exception as e:
-                last_err = e
-                print(f"[collect] {label} failed: {e}", flush=True)
-                if attempt <= retries:
-                    time.sleep(1.0)
-                else:
-                    print(f"[collect] giving up on {label}", flush=True)
-        time.sleep(0.3)
+def _fetch_with_retries(label, url, timeout, retries, verbose, session, state) -> List[dict]:
+    for attempt in range(1, retries + 2):
+        try:
+            if verbose: print(f"[collect] {label} attempt {attempt}/{retries+1}", flush=True)
+            return fetch_feed(label, url, timeout=timeout, verbose=verbose, session=session, state=state)
+        except Exception as e:
+            print(f"[collect] {label} failed: {e}", flush=True)
+            if attempt <= retries:
+                time.sleep(1.0 * attempt)
+    print(f"[collect] giving up on {label}", flush=True)
+    return []
+
+def collect_corpus(feeds: Dict[str, str], timeout: int = 10, retries: int = 1, verbose: bool = True,
+                   session: Optional[requests.Session] = None, state: Optional[Dict[str, dict]] = None,
+                   max_workers: Optional[int] = None, allow_empty: bool = False) -> pd.DataFrame:
+    """Fetch all feeds concurrently over one pooled session. Pass `state` (see
+       load_feed_state) to make the requests conditional; with allow_empty=True an
+       all-unchanged run returns an empty frame instead of raising."""
+    workers = max_workers or max(1, len(feeds))
+    session = session or make_session(workers)
+    with ThreadPoolExecutor(max_workers=workers) as ex:
+        futures = [ex.submit(_fetch_with_retries, label, url, timeout, retries, verbose, session, state)
+                   for label, url in feeds.items()]
+        all_docs = [d for f in futures for d in f.result()]
+    import pandas as pd
     # dedupe
     seen, deduped = set(), []
     for d in all_docs:
         key = d["link"] or d["text"][:120]
         if key not in seen:
             seen.add(key); deduped.append(d)
-    df = pd.DataFrame(deduped)
+    df = pd.DataFrame(deduped, columns=["label", "text", "title", "link", "source", "fetched_at"])
     print(f"[collect] total={len(all_docs)}  unique={len(df)}", flush=True)
-    if df.empty:
+    if df.empty and not allow_empty:
         raise RuntimeError("No documents fetched. Check network/SSL or try http feeds.")
     return df
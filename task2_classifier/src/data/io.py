@@ -8,3 +8,15 @@ def load_csv(path: str) -> pd.DataFrame:
     if df.empty:
         raise RuntimeError(f"Empty dataset: {path}")
     return df
+
+def load_dataset(path, columns=("label", "text")) -> pd.DataFrame:
+    """Load only `columns` from a corpus CSV or a Parquet store (data/store.py)."""
+    from .store import is_store
+    if is_store(path):
+        from .store import read
+        df = read(path, columns)
+    else:
+        df = pd.read_csv(path, usecols=list(columns))
+    if df.empty:
+        raise RuntimeError(f"Empty dataset: {path}")
+    return df
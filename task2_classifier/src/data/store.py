@@ -0,0 +1,218 @@
+# src/data/store.py
+# Partitioned columnar corpus store: Parquet files in a hive-style directory tree,
+# partitioned by label and fetch date. Writes only ever add new part files, so an
+# append costs O(new rows) and a crashed writer leaves no partial file behind.
+#
+#   task2_corpus.parquet/
+#     _keys                                   dedupe keys (see data/corpus.py)
+#     label=Business/fetched_at=2026-10-19/part-20261019T020000-1234-9f1c2a3b.parquet
+#     label=Health/fetched_at=unknown/part-...parquet      rows imported without a date
+#
+# Readers project columns (usually just label + text) and can stream record batches,
+# so training never materializes title/link/source. pyarrow is optional and imported
+# lazily; CSV stays supported through import_csv / export_csv.
+import hashlib, os, random, time, uuid
+from itertools import islice
+from pathlib import Path
+from typing import Iterator, Optional, Sequence
+from urllib.parse import quote, unquote
+
+import pandas as pd
+
+from .corpus import CORPUS_COLUMNS
+
+PARTITION_COLUMNS = ("label", "fetched_at")
+DATA_COLUMNS = tuple(c for c in CORPUS_COLUMNS if c not in PARTITION_COLUMNS)
+UNKNOWN_DATE = "unknown"
+STREAM_WINDOW = 16          # part files open at once while streaming
+COMPACT_TARGET_ROWS = 500000  # rows per part file written by compact()
+
+def _arrow():
+    try:
+        import pyarrow as pa
+        import pyarrow.dataset as ds
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise ImportError("The Parquet corpus store needs pyarrow: pip install pyarrow") from e
+    return pa, ds, pq
+
+def is_store(path) -> bool:
+    """A store is a directory, or a path named *.parquet (created on first append)."""
+    p = Path(path)
+    return p.is_dir() or p.suffix.lower() == ".parquet"
+
+def _partitioning():
+    pa, ds, _ = _arrow()
+    schema = pa.schema([(c, pa.string()) for c in PARTITION_COLUMNS])
+    return ds.partitioning(schema, flavor="hive")
+
+def _dataset(store_dir):
+    _, ds, _ = _arrow()
+    return ds.dataset(str(store_dir), format="parquet", partitioning=_partitioning())
+
+def _day(value) -> str:
+    s = "" if value is None or (isinstance(value, float) and value != value) else str(value).strip()
+    return s[:10] if s else UNKNOWN_DATE
+
+def append(df: pd.DataFrame, store_dir) -> int:
+    """Write `df` as new part files, one per (label, fetch day). Returns rows written."""
+    if df.empty:
+        return 0
+    pa, _, _ = _arrow()
+    root = Path(store_dir)
+    root.mkdir(parents=True, exist_ok=True)
+    df = df.reindex(columns=CORPUS_COLUMNS)
+    days = df["fetched_at"].map(_day)
+    written = 0
+    for (label, day), part in df.groupby([df["label"].astype(str), days], sort=True):
+        pdir = root / f"label={quote(label, safe='')}" / f"fetched_at={quote(day, safe='')}"
+        pdir.mkdir(parents=True, exist_ok=True)
+        data = {c: pa.array(part[c].astype(object).where(part[c].notna(), None).tolist(), type=pa.string())
+                for c in DATA_COLUMNS}
+        _write_part(pa.table(data), pdir)
+        written += len(part)
+    return written
+
+def read(store_dir, columns: Sequence[str] = ("label", "text"),
+         labels: Optional[Sequence[str]] = None) -> pd.DataFrame:
+    """Load only `columns` (partition columns included) into a DataFrame; `labels`
+       prunes whole partitions."""
+    _, ds, _ = _arrow()
+    flt = ds.field("label").isin(list(labels)) if labels else None
+    table = _dataset(store_dir).to_table(columns=list(columns), filter=flt)
+    return table.to_pandas()
+
+def iter_batches(store_dir, columns: Sequence[str] = ("label", "text"),
+                 batch_size: int = 10000, window: int = STREAM_WINDOW,
+                 seed: int = 42) -> Iterator[pd.DataFrame]:
+    """Stream DataFrames of at most `batch_size` rows with only `columns`, without
+       loading the whole corpus. Part files are visited in shuffled order and read
+       round-robin, at most `window` at a time (the next file is opened as one runs
+       out), so each chunk mixes labels and fetch dates instead of walking one
+       partition after another (which would feed partial_fit a single class at a
+       time), while open files stay bounded however many parts the store has."""
+    pa, _, _ = _arrow()
+    dset = _dataset(store_dir)
+    fragments = list(dset.get_fragments())
+    if not fragments:
+        return
+    random.Random(seed).shuffle(fragments)
+    window = max(1, window)
+    step = max(1, batch_size // window)
+    queue = iter(fragments)
+
+    def _open(fragment):
+        return iter(fragment.to_batches(schema=dset.schema, columns=list(columns), batch_size=step))
+
+    readers = [_open(f) for f in islice(queue, window)]
+    pending, rows = [], 0
+    while readers:
+        alive = []
+        for r in readers:
+            batch = next(r, None)
+            if batch is None:
+                nxt = next(queue, None)
+                if nxt is not None:
+                    alive.append(_open(nxt))
+                continue
+            alive.append(r)
+            if batch.num_rows:
+                pending.append(batch)
+                rows += batch.num_rows
+            if rows >= batch_size:
+                table = pa.Table.from_batches(pending)
+                yield table.slice(0, batch_size).to_pandas()
+                rest = table.slice(batch_size)
+                pending, rows = rest.to_batches(), rest.num_rows
+        readers = alive
+    if rows:
+        yield pa.Table.from_batches(pending).to_pandas()
+
+def count_rows(store_dir) -> pd.DataFrame:
+    """Rows per partition (from Parquet footers, no data pages read)."""
+    _, _, pq = _arrow()
+    rows = []
+    for f in sorted(Path(store_dir).glob("label=*/fetched_at=*/*.parquet")):
+        rows.append({"label": unquote(f.parent.parent.name.split("=", 1)[1]),
+                     "fetched_at": unquote(f.parent.name.split("=", 1)[1]),
+                     "rows": pq.ParquetFile(f).metadata.num_rows})
+    if not rows:
+        return pd.DataFrame(columns=["label", "fetched_at", "files", "rows"])
+    df = pd.DataFrame(rows)
+    return (df.groupby(["label", "fetched_at"]).agg(files=("rows", "size"), rows=("rows", "sum"))
+              .reset_index())
+
+def fingerprint(store_dir) -> str:
+    """Cheap content id: part files are immutable, so names + sizes identify the data."""
+    h = hashlib.sha256()
+    for f in sorted(Path(store_dir).glob("label=*/fetched_at=*/*.parquet")):
+        h.update(f"{f.relative_to(store_dir)}\x1f{f.stat().st_size}\x1e".encode("utf-8"))
+    return h.hexdigest()
+
+def _write_part(table, pdir: Path) -> Path:
+    _, _, pq = _arrow()
+    name = f"part-{time.strftime('%Y%m%dT%H%M%S')}-{os.getpid()}-{uuid.uuid4().hex[:8]}.parquet"
+    tmp = pdir / f".{name}.tmp"   # dot-prefixed: invisible to readers until renamed
+    pq.write_table(table, tmp, compression="zstd")
+    os.replace(tmp, pdir / name)
+    return pdir / name
+
+def _merge(pdir: Path, files) -> Path:
+    pa, _, pq = _arrow()
+    return _write_part(pa.concat_tables([pq.read_table(f, columns=list(DATA_COLUMNS)) for f in files]), pdir)
+
+def compact(store_dir, target_rows: int = COMPACT_TARGET_ROWS) -> dict:
+    """Merge the small part files of each partition into files of up to `target_rows`
+       rows. Every append adds one file per (label, day), so a store fed by frequent
+       small fetches accumulates many tiny files; this rewrites them and removes the
+       originals. Merged files are renamed into place before the originals are
+       deleted, so readers never miss rows (run it while no trainer is reading, or a
+       reader may briefly see both). Returns {"partitions", "files_before", "files_after"}."""
+    _, _, pq = _arrow()
+    root = Path(store_dir)
+    stats = {"partitions": 0, "files_before": 0, "files_after": 0}
+    for pdir in sorted(p for p in root.glob("label=*/fetched_at=*") if p.is_dir()):
+        parts = sorted(pdir.glob("*.parquet"))
+        stats["files_before"] += len(parts)
+        sizes = {f: pq.ParquetFile(f).metadata.num_rows for f in parts}
+        small = [f for f in parts if sizes[f] < target_rows]
+        groups, rows = [[]], 0
+        for f in small:
+            if groups[-1] and rows + sizes[f] > target_rows:
+                groups.append([])
+                rows = 0
+            groups[-1].append(f)
+            rows += sizes[f]
+        merged = [g for g in groups if len(g) > 1]
+        for group in merged:
+            _merge(pdir, group)
+            for f in group:
+                f.unlink()
+        stats["partitions"] += bool(merged)
+        stats["files_after"] += len(parts) - sum(len(g) - 1 for g in merged)
+    return stats
+
+def import_csv(csv_path, store_dir, chunk_size: int = 50000) -> int:
+    """Append rows of a corpus CSV that the store doesn't have yet (deduplicated on the
+       same keys as data/corpus.py). Returns rows added."""
+    from .corpus import append_new
+    added = 0
+    for chunk in pd.read_csv(csv_path, chunksize=chunk_size):
+        if "link" not in chunk:
+            chunk["link"] = ""
+        added += len(append_new(chunk.dropna(subset=["label", "text"]), store_dir))
+    return added
+
+def export_csv(store_dir, csv_path, batch_size: int = 50000) -> int:
+    """Write the whole store as one CSV with the corpus columns, batch by batch."""
+    n, header = 0, True
+    tmp = f"{csv_path}.tmp"
+    for batch in iter_batches(store_dir, CORPUS_COLUMNS, batch_size):
+        batch["fetched_at"] = batch["fetched_at"].where(batch["fetched_at"] != UNKNOWN_DATE, None)
+        batch.to_csv(tmp, mode="w" if header else "a", header=header, index=False)
+        header = False
+        n += len(batch)
+    if header:   # empty store
+        pd.DataFrame(columns=CORPUS_COLUMNS).to_csv(tmp, index=False)
+    os.replace(tmp, csv_path)
+    return n
@@ -0,0 +1,76 @@
+# src/data/stream.py
+# Chunked readers for datasets too large to load at once.
+import zlib
+from pathlib import Path
+from typing import Iterator
+import numpy as np
+import pandas as pd
+
+def iter_chunks(path: str, chunk_size: int = 10000, columns=("label", "text"),
+                shuffle_rows: int = 0, seed: int = 0) -> Iterator[pd.DataFrame]:
+    """Yield DataFrames of at most `chunk_size` rows from a .csv or .jsonl file or a
+       Parquet store (record batches, only `columns` read), dropping rows where any
+       of `columns` is missing. With shuffle_rows > 0 rows pass through a shuffle
+       buffer of that size (see shuffle_buffer); otherwise they come in file order."""
+    chunks = _iter_chunks(path, chunk_size, columns)
+    if shuffle_rows > 0:
+        chunks = shuffle_buffer(chunks, chunk_size, shuffle_rows, seed)
+    yield from chunks
+
+def shuffle_buffer(chunks: Iterator[pd.DataFrame], chunk_size: int, buffer_rows: int,
+                   seed: int = 0) -> Iterator[pd.DataFrame]:
+    """Re-chunk a stream through a bounded shuffle buffer: rows are pooled until
+       `buffer_rows` are held, the pool is permuted, and chunks are drawn from it
+       until half remains. A file sorted by label (like the shipped corpus) then
+       feeds partial_fit mixed classes, as long as the buffer spans several labels'
+       runs; memory stays O(buffer_rows)."""
+    rng = np.random.default_rng(seed)
+    pending, held = [], 0
+    for chunk in chunks:
+        pending.append(chunk)
+        held += len(chunk)
+        if held < buffer_rows:
+            continue
+        pool = pd.concat(pending, ignore_index=True)
+        pool = pool.iloc[rng.permutation(len(pool))].reset_index(drop=True)
+        while len(pool) - chunk_size >= buffer_rows // 2:
+            yield pool.iloc[:chunk_size]
+            pool = pool.iloc[chunk_size:]
+        pending, held = [pool], len(pool)
+    if held:
+        pool = pd.concat(pending, ignore_index=True)
+        pool = pool.iloc[rng.permutation(len(pool))].reset_index(drop=True)
+        for start in range(0, len(pool), chunk_size):
+            yield pool.iloc[start:start + chunk_size]
+
+def _iter_chunks(path: str, chunk_size: int, columns) -> Iterator[pd.DataFrame]:
+    from .store import is_store
+    suffix = Path(path).suffix.lower()
+    if is_store(path):
+        from .store import iter_batches
+        for chunk in iter_batches(path, columns, chunk_size):
+            chunk = chunk[list(columns)].dropna()
+            if not chunk.empty:
+                yield chunk
+        return
+    if suffix in (".jsonl", ".ndjson"):
+        reader = pd.read_json(path, lines=True, chunksize=chunk_size)
+    elif suffix == ".csv":
+        reader = pd.read_csv(path, usecols=list(columns), chunksize=chunk_size)
+    else:
+        raise ValueError(f"Unsupported dataset format: {path} (expected .csv, .jsonl or a Parquet store)")
+    with reader:
+        for chunk in reader:
+            chunk = chunk[list(columns)].dropna()
+            if not chunk.empty:
+                yield chunk
+
+def holdout_mask(texts: pd.Series, test_size: float) -> np.ndarray:
+    """Deterministic held-out split for streams: a row is held out when the crc32
+       of its text falls in the first `test_size` fraction of the hash space, so the
+       same document lands on the same side on every pass without keeping an index."""
+    cut = int(test_size * 10000)
+    return np.fromiter(
+        (zlib.crc32(t.encode("utf-8")) % 10000 < cut for t in texts.astype(str)),
+        dtype=bool, count=len(texts),
+    )
@@ -0,0 +1,101 @@
+# src/features/cache.py
+# Fit the featurizer once per (dataset, split, vectorizer config) and persist the
+# sparse matrices + fitted vectorizer, so reruns on the same data skip featurization.
+# Every fetch changes the dataset hash, so entries are evicted least recently used
+# first once the directory grows past a size cap.
+import hashlib, json, os
+from pathlib import Path
+from typing import Iterable, Tuple
+
+import joblib
+import pandas as pd
+import scipy.sparse as sp
+import sklearn
+
+def dataset_hash(df: pd.DataFrame, columns=("label", "text")) -> str:
+    h = hashlib.sha256()
+    for row in df[list(columns)].astype(str).itertuples(index=False):
+        h.update("\x1f".join(row).encode("utf-8"))
+        h.update(b"\x1e")
+    return h.hexdigest()
+
+def vectorizer_config(vec) -> str:
+    """Stable text form of every (nested) vectorizer parameter."""
+    params = vec.get_params(deep=True)
+    return json.dumps({k: repr(v) for k, v in sorted(params.items())
+                       if not hasattr(v, "get_params")}, sort_keys=True)
+
+def features_key(data_hash: str, vec, **extra) -> str:
+    payload = json.dumps({"data": data_hash, "vec": vectorizer_config(vec),
+                          "sklearn": sklearn.__version__, **extra}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:20]
+
+def _paths(cache_dir: Path, key: str):
+    return (cache_dir / f"{key}-train.npz", cache_dir / f"{key}-test.npz", cache_dir / f"{key}-vec.joblib")
+
+def evict(cache_dir, max_mb: float, keep: str = "") -> int:
+    """Delete whole entries, least recently used first, until the cache is under
+       `max_mb` (the entry `keep` is never deleted). max_mb <= 0 disables the cap.
+       Returns the number of entries removed."""
+    cache_dir = Path(cache_dir)
+    if max_mb <= 0 or not cache_dir.is_dir():
+        return 0
+    entries = {}   # key -> [last use, bytes, paths]
+    for f in cache_dir.iterdir():
+        if not f.is_file() or ".tmp" in f.name:
+            continue
+        try:
+            st = f.stat()
+        except FileNotFoundError:   # evicted by a concurrent run
+            continue
+        e = entries.setdefault(f.name.split("-", 1)[0], [0.0, 0, []])
+        e[0], e[1] = max(e[0], st.st_mtime), e[1] + st.st_size
+        e[2].append(f)
+    total, removed = sum(e[1] for e in entries.values()), 0
+    for key, (_, size, files) in sorted(entries.items(), key=lambda kv: kv[1][0]):
+        if total <= max_mb * 2**20:
+            break
+        if key == keep:
+            continue
+        for f in files:
+            f.unlink(missing_ok=True)
+        total -= size
+        removed += 1
+    return removed
+
+def cached_features(
+    vec,
+    train_texts: Iterable[str],
+    test_texts: Iterable[str],
+    key: str,
+    cache_dir=None,
+    max_mb: float = 0,
+) -> Tuple[object, sp.csr_matrix, sp.csr_matrix, bool]:
+    """Return (fitted_vec, X_train, X_test, hit). On a miss, fit `vec` on the train
+       texts, transform both splits and write `<key>-{train,test}.npz` + `<key>-vec.joblib`,
+       then evict other entries past `max_mb` (see evict). cache_dir=None disables the cache."""
+    if cache_dir is not None:
+        cache_dir = Path(cache_dir)
+        p_train, p_test, p_vec = _paths(cache_dir, key)
+        try:
+            hit = (joblib.load(p_vec), sp.load_npz(p_train).tocsr(), sp.load_npz(p_test).tocsr(), True)
+            for path in (p_train, p_test, p_vec):
+                os.utime(path)   # mtime doubles as "last used" for eviction
+            return hit
+        except FileNotFoundError:   # never written, or evicted meanwhile
+            pass
+
+    X_train = vec.fit_transform(train_texts).tocsr()
+    X_test = vec.transform(test_texts).tocsr()
+    if cache_dir is not None:
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        # write to temp names first so an interrupted run never leaves a partial entry
+        for obj, path in ((X_train, p_train), (X_test, p_test), (vec, p_vec)):
+            tmp = path.with_name(path.stem + ".tmp" + path.suffix)
+            if path.suffix == ".npz":
+                sp.save_npz(tmp, obj)
+            else:
+                joblib.dump(obj, tmp)
+            tmp.replace(path)
+        evict(cache_dir, max_mb, keep=key)
+    return vec, X_train, X_test, False
@@ -1,5 +1,7 @@
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.pipeline import FeatureUnion
+from sklearn.feature_extraction.text import HashingVectorizer, TfidfTransformer, TfidfVectorizer
+from sklearn.pipeline import FeatureUnion, Pipeline
+
+from ..config import DEFAULT_N_FEATURES, FEATURE_BACKENDS
 
 def build_vectorizer_union() -> FeatureUnion:
     word_vec = TfidfVectorizer(
@@ -16,3 +18,54 @@ def build_vectorizer_union() -> FeatureUnion:
         sublinear_tf=True,
     )
     return FeatureUnion([("word", word_vec), ("char", char_vec)])
+
+def build_vectorizer_hashing(n_features: int = DEFAULT_N_FEATURES) -> FeatureUnion:
+    """Same word + char_wb n-grams as build_vectorizer_union, but hashed into
+       `n_features` columns per block: no vocabulary dict, bounded memory.
+       min_df/max_df need global counts, so they have no hashing equivalent."""
+    word_vec = Pipeline([
+        ("hash", HashingVectorizer(
+            stop_words="english",
+            ngram_range=(1, 2),
+            n_features=n_features,
+            alternate_sign=False,   # keep counts non-negative for MultinomialNB
+            norm=None,
+        )),
+        ("tfidf", TfidfTransformer(sublinear_tf=True)),
+    ])
+    char_vec = Pipeline([
+        ("hash", HashingVectorizer(
+            analyzer="char_wb",
+            ngram_range=(3, 5),
+            n_features=n_features,
+            alternate_sign=False,
+            norm=None,
+        )),
+        ("tfidf", TfidfTransformer(sublinear_tf=True)),
+    ])
+    return FeatureUnion([("word", word_vec), ("char", char_vec)])
+
+def build_vectorizer(kind: str = "union", n_features: int = DEFAULT_N_FEATURES) -> FeatureUnion:
+    if kind == "union":
+        return build_vectorizer_union()
+    if kind == "hashing":
+        return build_vectorizer_hashing(n_features)
+    raise ValueError(f"Unknown feature backend: {kind!r} (expected one of {FEATURE_BACKENDS})")
+
+def build_vectorizer_streaming(n_features: int = DEFAULT_N_FEATURES) -> FeatureUnion:
+    """Fully stateless featurizer for out-of-core training: hashed word + char_wb
+       n-grams, l2-normalised per block. Nothing is learned, so every chunk is
+       transformed independently and the model can be updated with partial_fit."""
+    word_vec = HashingVectorizer(
+        stop_words="english",
+        ngram_range=(1, 2),
+        n_features=n_features,
+        alternate_sign=False,
+    )
+    char_vec = HashingVectorizer(
+        analyzer="char_wb",
+        ngram_range=(3, 5),
+        n_features=n_features,
+        alternate_sign=False,
+    )
+    return FeatureUnion([("word", word_vec), ("char", char_vec)])
@@ -0,0 +1,367 @@
+# src/models/artifact.py
+# Compact model artifact: a directory of plain .npy arrays + meta.json instead of a
+# pickled Pipeline. Weights and idf are float32, vocabularies are sorted byte-string
+# arrays (looked up with np.searchsorted), and everything can be memory-mapped, so
+# loading is a handful of mmap calls rather than unpickling dicts and estimators.
+#
+#   <dir>/meta.json              classes, scoring link, per-block featurizer params
+#   <dir>/bias.npy               (n_classes,)
+#   <dir>/<block>.keys.npy       sorted terms (|S) or hashed column ids (int64)
+#   <dir>/<block>.idf.npy        (n_kept,) float32, only if the block uses idf
+#   <dir>/<block>.weights.npy    (n_kept, n_classes) float32
+#
+# Features no training document ever hit (zero feature_count_ for NB, all-zero
+# coefficients for linear models) are pruned at export. In a hashing block they all
+# share one weight row and one idf, so they're stored once per block ("rest") and
+# inference folds every hashed column outside `keys` into it: scores and the
+# per-document norm stay exact. prune_tol > 0 additionally drops features whose
+# weights lie within prune_tol x the block's largest weight of that rest row (of 0
+# in vocabulary blocks, where dropped terms also leave the norm); that is lossy, and
+# export reports the agreement with the original pipeline.
+import json, os, shutil, time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+import scipy.sparse as sp
+from sklearn.feature_extraction.text import HashingVectorizer, TfidfTransformer, TfidfVectorizer
+from sklearn.pipeline import FeatureUnion, Pipeline
+
+FORMAT_VERSION = 1
+META_FILE = "meta.json"
+
+# Parameters that define tokenization; everything else is baked into the arrays.
+_ANALYSIS_PARAMS = ("analyzer", "ngram_range", "stop_words", "lowercase", "strip_accents",
+                    "token_pattern", "encoding", "decode_error")
+
+def is_compact_artifact(path) -> bool:
+    return os.path.isdir(path) and os.path.exists(os.path.join(path, META_FILE))
+
+# ------------------------------
+# Export
+# ------------------------------
+def _analysis_params(vec) -> dict:
+    params = vec.get_params()
+    for name in ("preprocessor", "tokenizer"):
+        if params.get(name) is not None:
+            raise ValueError(f"Cannot export a vectorizer with a custom {name}")
+    if callable(params.get("analyzer")):
+        raise ValueError("Cannot export a vectorizer with a callable analyzer")
+    out = {k: params[k] for k in _ANALYSIS_PARAMS if k in params}
+    out["ngram_range"] = list(out["ngram_range"])
+    if isinstance(out.get("stop_words"), (list, tuple, set, frozenset)):
+        out["stop_words"] = sorted(out["stop_words"])
+    return out
+
+def _describe_block(name: str, block) -> dict:
+    """Normalise the supported featurizers to one description:
+       raw counts (vocabulary or hashing) -> binary/sublinear tf -> * idf -> norm."""
+    if isinstance(block, TfidfVectorizer):
+        return {"name": name, "kind": "vocab", "analysis": _analysis_params(block),
+                "binary": block.binary, "sublinear_tf": block.sublinear_tf, "norm": block.norm,
+                "idf": block.idf_ if block.use_idf else None,
+                "vocabulary": block.vocabulary_}
+    if isinstance(block, HashingVectorizer):
+        hv, tfidf = block, None
+    elif (isinstance(block, Pipeline) and len(block.steps) == 2
+          and isinstance(block.steps[0][1], HashingVectorizer)
+          and isinstance(block.steps[1][1], TfidfTransformer)):
+        hv, tfidf = block.steps[0][1], block.steps[1][1]
+        if hv.norm is not None:
+            raise ValueError("Hashing block followed by TfidfTransformer must use norm=None")
+    else:
+        raise ValueError(f"Unsupported featurizer block {name!r}: {type(block).__name__}")
+    desc = {"name": name, "kind": "hashing", "analysis": _analysis_params(hv),
+            "n_features": hv.n_features, "alternate_sign": hv.alternate_sign, "binary": hv.binary}
+    if tfidf is None:
+        desc.update(sublinear_tf=False, norm=hv.norm, idf=None)
+    else:
+        desc.update(sublinear_tf=tfidf.sublinear_tf, norm=tfidf.norm,
+                    idf=tfidf.idf_ if tfidf.use_idf else None)
+    return desc
+
+def _linear_params(clf):
+    """Return (weights (n_features, n_classes), bias, link) for supported classifiers."""
+    from sklearn.linear_model import LogisticRegression, SGDClassifier   # export only
+    from sklearn.naive_bayes import MultinomialNB
+    if isinstance(clf, MultinomialNB):
+        W = clf.feature_log_prob_.T.copy()
+        return W, clf.class_log_prior_.copy(), "softmax"
+    if isinstance(clf, LogisticRegression):
+        return clf.coef_.T.copy(), clf.intercept_.copy(), "softmax"
+    if isinstance(clf, SGDClassifier) and clf.loss == "log_loss":
+        link = "softmax" if clf.coef_.shape[0] == 1 else "ovr"
+        return clf.coef_.T.copy(), clf.intercept_.copy(), link
+    raise ValueError(f"Unsupported classifier for compact export: {type(clf).__name__}")
+
+def _unseen_features(clf) -> np.ndarray:
+    """Columns the classifier learned nothing about (no training mass in any class)."""
+    if hasattr(clf, "feature_count_"):
+        return clf.feature_count_.sum(axis=0) == 0
+    return np.all(clf.coef_ == 0, axis=0)
+
+def _prune_mask(desc: dict, Wb: np.ndarray, unseen: np.ndarray, prune_tol: float):
+    """(keep indices, rest weight row or None, rest idf or None) for one block."""
+    rest, rest_idf = None, None
+    drop = np.zeros(len(Wb), dtype=bool)
+    if desc["kind"] == "hashing" and unseen.any():
+        rest = Wb[np.flatnonzero(unseen)[0]]
+        drop = unseen & np.all(Wb == rest, axis=1)
+        if desc["idf"] is not None:
+            idf = np.asarray(desc["idf"])
+            rest_idf = float(idf[np.flatnonzero(drop)[0]]) if drop.any() else None
+            drop &= idf == rest_idf
+    if prune_tol > 0:
+        dev = np.abs(Wb - (rest if rest is not None else 0.0)).max(axis=1)
+        drop |= dev <= prune_tol * (dev.max() or 1.0)
+        if rest is not None and desc["idf"] is not None and rest_idf is None:
+            rest_idf = float(np.asarray(desc["idf"])[np.flatnonzero(drop)[0]])
+    if rest is not None and not drop.any():
+        rest = None
+    return np.flatnonzero(~drop), rest, rest_idf
+
+def export_compact(pipeline: Pipeline, out_dir, prune_tol: float = 0.0) -> Dict[str, int]:
+    """Write `pipeline` as a compact artifact directory; returns kept/total feature counts.
+       The directory is built next to `out_dir` and renamed into place."""
+    vec, clf = pipeline.named_steps.get("vec"), pipeline.named_steps.get("clf")
+    blocks = vec.transformer_list if isinstance(vec, FeatureUnion) else [("vec", vec)]
+    weights_by_block = (vec.transformer_weights or {}) if isinstance(vec, FeatureUnion) else {}
+    W, bias, link = _linear_params(clf)
+    unseen = _unseen_features(clf)
+    # Per-feature constants shared by all classes don't change a softmax: center them
+    # away so that "no signal" features have weight exactly 0 and can be pruned.
+    if link == "softmax" and W.shape[1] > 1:
+        W = W - W.mean(axis=1, keepdims=True)
+
+    out_dir = Path(out_dir)
+    tmp = out_dir.with_name(out_dir.name + ".tmp")
+    shutil.rmtree(tmp, ignore_errors=True)
+    tmp.mkdir(parents=True)
+
+    meta = {"format": FORMAT_VERSION, "classes": [str(c) for c in clf.classes_],
+            "link": link, "binary_output": W.shape[1] == 1, "blocks": []}
+    np.save(tmp / "bias.npy", bias.astype(np.float32))
+    counts = {"total": 0, "kept": 0}
+    offset = 0
+    for name, block in blocks:
+        desc = _describe_block(name, block)
+        width = desc["n_features"] if desc["kind"] == "hashing" else len(desc["vocabulary"])
+        Wb = W[offset:offset + width]
+        keep, rest, rest_idf = _prune_mask(desc, Wb, unseen[offset:offset + width], prune_tol)
+        offset += width
+        if desc["kind"] == "vocab":
+            inv = np.empty(width, dtype=object)
+            for term, col in desc["vocabulary"].items():
+                inv[col] = term.encode("utf-8")
+            keys = np.array(list(inv[keep]), dtype=bytes)
+            order = np.argsort(keys, kind="stable")
+            keys, keep = keys[order], keep[order]
+        else:
+            keys = keep.astype(np.int64)   # already sorted
+        np.save(tmp / f"{name}.keys.npy", keys)
+        np.save(tmp / f"{name}.weights.npy", np.ascontiguousarray(Wb[keep], dtype=np.float32))
+        if desc["idf"] is not None:
+            np.save(tmp / f"{name}.idf.npy", np.asarray(desc["idf"], dtype=np.float32)[keep])
+        entry = {k: v for k, v in desc.items() if k not in ("idf", "vocabulary")}
+        entry.update(use_idf=desc["idf"] is not None, weight=weights_by_block.get(name, 1.0),
+                     kept=int(len(keep)), total=int(width))
+        if rest is not None:
+            entry.update(rest_weights=[float(x) for x in rest], rest_idf=rest_idf)
+        meta["blocks"].append(entry)
+        counts["total"] += width
+        counts["kept"] += len(keep)
+    if offset != W.shape[0]:
+        raise ValueError(f"Featurizer width {offset} != classifier width {W.shape[0]}")
+    meta.update(counts, prune_tol=prune_tol)
+    with open(tmp / META_FILE, "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2)
+
+    if out_dir.exists():
+        old = out_dir.with_name(out_dir.name + ".old")
+        shutil.rmtree(old, ignore_errors=True)
+        out_dir.rename(old)
+        tmp.rename(out_dir)
+        shutil.rmtree(old, ignore_errors=True)
+    else:
+        tmp.rename(out_dir)
+    return counts
+
+# ------------------------------
+# Load + inference
+# ------------------------------
+class _Block:
+    def __init__(self, root: Path, desc: dict, mmap_mode: Optional[str]):
+        self.desc = desc
+        self.keys = np.load(root / f"{desc['name']}.keys.npy", mmap_mode=mmap_mode)
+        self.weights = np.load(root / f"{desc['name']}.weights.npy", mmap_mode=mmap_mode)
+        self.idf = (np.load(root / f"{desc['name']}.idf.npy", mmap_mode=mmap_mode)
+                    if desc["use_idf"] else None)
+        analysis = dict(desc["analysis"], ngram_range=tuple(desc["analysis"]["ngram_range"]))
+        if desc["kind"] == "vocab":
+            self.analyzer = TfidfVectorizer(**analysis).build_analyzer()
+            self.hasher = None
+        else:
+            self.analyzer = None
+            self.hasher = HashingVectorizer(n_features=desc["n_features"], norm=None,
+                                            alternate_sign=desc["alternate_sign"], **analysis)
+        rest = desc.get("rest_weights")
+        self.rest = np.asarray(rest, dtype=np.float64) if rest is not None else None
+
+    def _raw_counts(self, texts: List[str]):
+        """(counts over `keys`, counts of the hashed columns folded into "rest" or None)."""
+        n, k = len(texts), len(self.keys)
+        if self.hasher is not None:
+            H = self.hasher.transform(texts).tocoo()
+            pos = np.searchsorted(self.keys, H.col)
+            hit = pos < k
+            hit[hit] = self.keys[pos[hit]] == H.col[hit]
+            X = sp.csr_matrix((H.data[hit], (H.row[hit], pos[hit])), shape=(n, k), dtype=np.float64)
+            R = None
+            if self.rest is not None:
+                miss = ~hit
+                R = sp.csr_matrix((H.data[miss], (H.row[miss], H.col[miss])),
+                                  shape=(n, self.desc["n_features"]), dtype=np.float64)
+            return X, R
+        rows, toks = [], []
+        for i, text in enumerate(texts):
+            doc = self.analyzer(text)
+            toks.extend(t.encode("utf-8") for t in doc)
+            rows.extend([i] * len(doc))
+        if not toks or k == 0:
+            return sp.csr_matrix((n, k), dtype=np.float64), None
+        toks = np.array(toks, dtype=bytes)
+        pos = np.searchsorted(self.keys, toks)
+        hit = pos < k
+        hit[hit] = self.keys[pos[hit]] == toks[hit]
+        rows = np.asarray(rows)[hit]
+        return sp.csr_matrix((np.ones(len(rows)), (rows, pos[hit])), shape=(n, k)), None  # duplicates summed
+
+    def _tf(self, X: sp.csr_matrix) -> sp.csr_matrix:
+        X.sum_duplicates()
+        if self.desc["binary"]:
+            X.data = np.sign(X.data)
+        if self.desc["sublinear_tf"]:
+            np.log(X.data, X.data)
+            X.data += 1
+        return X
+
+    def transform(self, texts: List[str]):
+        """(features over `keys`, per-document total of the "rest" columns or None),
+           normalised over all columns as the original featurizer does."""
+        X, R = self._raw_counts(texts)
+        X = self._tf(X)
+        if self.idf is not None:
+            X = X @ sp.diags(np.asarray(self.idf, dtype=np.float64))
+        X = sp.csr_matrix(X)
+        if R is not None:
+            R = self._tf(R)
+            if self.idf is not None:
+                R = R * self.desc["rest_idf"]
+        norm = self.desc["norm"]
+        scale = None
+        if norm:
+            if norm == "l2":
+                sq = np.asarray(X.multiply(X).sum(axis=1)).ravel()
+                if R is not None:
+                    sq += np.asarray(R.multiply(R).sum(axis=1)).ravel()
+                lens = np.sqrt(sq)
+            else:
+                lens = np.asarray(abs(X).sum(axis=1)).ravel()
+                if R is not None:
+                    lens += np.asarray(abs(R).sum(axis=1)).ravel()
+            lens[lens == 0] = 1.0
+            scale = 1.0 / lens
+            X = sp.csr_matrix(sp.diags(scale) @ X)
+        if self.desc["weight"] != 1.0:
+            X = X * self.desc["weight"]
+        rest = None
+        if R is not None:
+            rest = np.asarray(R.sum(axis=1)).ravel() * self.desc["weight"]
+            if scale is not None:
+                rest *= scale
+        return X, rest
+
+class CompactModel:
+    """Inference-only linear text classifier loaded from an export_compact() directory.
+       Mirrors the parts of the Pipeline API used for serving: classes_,
+       predict_proba(texts), predict(texts)."""
+
+    def __init__(self, path, mmap_mode: Optional[str] = "r"):
+        root = Path(path)
+        with open(root / META_FILE, encoding="utf-8") as f:
+            self.meta = json.load(f)
+        if self.meta.get("format") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported compact model format: {self.meta.get('format')}")
+        self.path = str(root)
+        self.classes_ = np.array(self.meta["classes"])
+        self.bias = np.load(root / "bias.npy")
+        self.blocks = [_Block(root, d, mmap_mode) for d in self.meta["blocks"]]
+
+    def _scores(self, texts: List[str], timer=None):
+        """(decision scores, seconds spent in the dot products). `timer(stage, seconds)`,
+           if given, receives each block's featurization time as "vec:<name>"."""
+        scores = np.tile(self.bias.astype(np.float64), (len(texts), 1))
+        dot_s = 0.0
+        for block in self.blocks:
+            t0 = time.perf_counter()
+            X, rest = block.transform(texts)
+            t1 = time.perf_counter()
+            scores += X @ np.asarray(block.weights, dtype=np.float64)
+            if rest is not None:
+                scores += np.outer(rest, block.rest)
+            dot_s += time.perf_counter() - t1
+            if timer is not None:
+                timer(f"vec:{block.desc['name']}", t1 - t0)
+        return scores, dot_s
+
+    def decision_function(self, texts: List[str]) -> np.ndarray:
+        return self._scores(texts)[0]
+
+    def predict_proba(self, texts: List[str], timer=None) -> np.ndarray:
+        """`timer` gets per-block featurization times and "clf" (dot products + link)."""
+        scores, dot_s = self._scores(list(texts), timer)
+        t0 = time.perf_counter()
+        probs = self._link(scores)
+        if timer is not None:
+            timer("clf", dot_s + time.perf_counter() - t0)
+        return probs
+
+    def _link(self, scores: np.ndarray) -> np.ndarray:
+        if self.meta["binary_output"]:
+            scores = np.hstack([np.zeros_like(scores), scores])
+        if self.meta["link"] == "ovr":
+            p = 1.0 / (1.0 + np.exp(-scores))
+            return p / p.sum(axis=1, keepdims=True)
+        scores -= scores.max(axis=1, keepdims=True)
+        np.exp(scores, scores)
+        return scores / scores.sum(axis=1, keepdims=True)
+
+    def predict(self, texts: List[str]) -> np.ndarray:
+        return self.classes_[self.predict_proba(texts).argmax(axis=1)]
+
+    def warm_up(self) -> None:
+        """Fault every mapped page in and exercise the tokenizers once."""
+        for block in self.blocks:
+            for arr in (block.keys, block.weights, block.idf):
+                if arr is not None and arr.size:
+                    np.asarray(arr).view(np.uint8).sum()
+        self.predict_proba(["warm up the model"])
+
+def load_compact(path, mmap_mode: Optional[str] = "r") -> CompactModel:
+    return CompactModel(path, mmap_mode=mmap_mode)
+
+def with_unseen_tokens(texts: List[str], seed: int = 0) -> List[str]:
+    """Copies of `texts` with made-up words appended, so a comparison also covers
+       hashed columns no training document hit (the pruned "rest" columns)."""
+    rng = np.random.default_rng(seed)
+    letters = np.array(list("bcdfghjklmnpqrstvwxz"))
+    return [t + " " + " ".join("".join(rng.choice(letters, 7)) for _ in range(3)) for t in texts]
+
+def compare_models(reference, compact: CompactModel, texts: List[str]) -> Dict[str, float]:
+    """Label agreement and max |Δprob| of a compact export vs. the original pipeline."""
+    ref = reference.predict_proba(texts)
+    got = compact.predict_proba(texts)
+    order = [list(compact.classes_).index(str(c)) for c in reference.classes_]
+    got = got[:, order]
+    return {"agreement": float((ref.argmax(axis=1) == got.argmax(axis=1)).mean()),
+            "max_abs_prob_diff": float(np.abs(ref - got).max())}
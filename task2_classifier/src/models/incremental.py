@@ -0,0 +1,100 @@
+# src/models/incremental.py
+# Out-of-core training: stream the dataset in chunks through a stateless hashing
+# featurizer and update the classifiers with partial_fit. Memory is bounded by
+# chunk_size, the shuffle buffer and n_features, not by the number of rows.
+import warnings
+warnings.filterwarnings("ignore", category=UserWarning)
+warnings.filterwarnings("ignore", category=FutureWarning)
+
+import numpy as np
+from typing import Dict, Optional, Tuple
+from sklearn.linear_model import SGDClassifier
+from sklearn.metrics import confusion_matrix
+from sklearn.naive_bayes import MultinomialNB
+from sklearn.pipeline import Pipeline
+
+from ..config import LABELS, RSEED, STREAM_SHUFFLE_ROWS
+from ..data.stream import iter_chunks, holdout_mask
+from ..features.vectorizer import build_vectorizer_streaming, DEFAULT_N_FEATURES
+from .plot import save_confusion_matrix
+from .registry import atomic_dump
+
+def build_incremental_models() -> Dict[str, object]:
+    return {
+        "MultinomialNB": MultinomialNB(alpha=0.1),
+        "SGD": SGDClassifier(loss="log_loss", alpha=1e-5, random_state=RSEED),
+    }
+
+def _scores_from_cm(cm: np.ndarray) -> Tuple[float, float]:
+    total = cm.sum()
+    acc = float(np.trace(cm) / total) if total else 0.0
+    tp = np.diag(cm).astype(float)
+    prec = np.divide(tp, cm.sum(axis=0), out=np.zeros_like(tp), where=cm.sum(axis=0) > 0)
+    rec = np.divide(tp, cm.sum(axis=1), out=np.zeros_like(tp), where=cm.sum(axis=1) > 0)
+    f1 = np.divide(2 * prec * rec, prec + rec, out=np.zeros_like(tp), where=(prec + rec) > 0)
+    return acc, float(f1.mean())
+
+def train_incremental(
+    dataset: str,
+    model_out: str,
+    cm_out: str,
+    test_size: float = 0.2,
+    chunk_size: int = 10000,
+    n_features: int = DEFAULT_N_FEATURES,
+    holdout: Optional[str] = None,
+    epochs: int = 1,
+    shuffle_rows: int = STREAM_SHUFFLE_ROWS,
+) -> Tuple[Pipeline, str, float]:
+    """Train on `dataset` (.csv/.jsonl) chunk by chunk. Evaluation uses the separate
+       `holdout` stream if given, otherwise a deterministic hash split of `dataset`.
+       Training rows pass through a `shuffle_rows` shuffle buffer, reseeded per epoch."""
+    vec = build_vectorizer_streaming(n_features)
+    models = build_incremental_models()
+    classes = np.array(LABELS)
+    print(f"[stream] dataset={dataset} chunk_size={chunk_size} n_features={n_features} "
+          f"shuffle_rows={shuffle_rows}", flush=True)
+
+    seen = 0
+    for epoch in range(1, epochs + 1):
+        chunks = iter_chunks(dataset, chunk_size, shuffle_rows=shuffle_rows, seed=RSEED + epoch)
+        for i, chunk in enumerate(chunks, start=1):
+            chunk = chunk[chunk["label"].isin(LABELS)]
+            if holdout is None:
+                chunk = chunk[~holdout_mask(chunk["text"], test_size)]
+            if chunk.empty:
+                continue
+            X = vec.transform(chunk["text"].astype(str))
+            y = chunk["label"].to_numpy()
+            for clf in models.values():
+                clf.partial_fit(X, y, classes=classes)
+            seen += len(chunk)
+            print(f"[stream] epoch {epoch} chunk {i}: rows={len(chunk)} total={seen}", flush=True)
+    if seen == 0:
+        raise RuntimeError(f"Empty dataset: {dataset}")
+
+    cms = {name: np.zeros((len(LABELS), len(LABELS)), dtype=np.int64) for name in models}
+    for chunk in iter_chunks(holdout or dataset, chunk_size):
+        chunk = chunk[chunk["label"].isin(LABELS)]
+        if holdout is None:
+            chunk = chunk[holdout_mask(chunk["text"], test_size)]
+        if chunk.empty:
+            continue
+        X = vec.transform(chunk["text"].astype(str))
+        for name, clf in models.items():
+            cms[name] += confusion_matrix(chunk["label"], clf.predict(X), labels=LABELS)
+
+    best_name, best_acc = None, -1.0
+    for name, cm in cms.items():
+        acc, f1 = _scores_from_cm(cm)
+        print(f"\n=== {name} (streamed) ===")
+        print(f"Held-out rows: {int(cm.sum())}  Accuracy: {acc:.3f}  Macro-F1: {f1:.3f}")
+        if acc > best_acc:
+            best_name, best_acc = name, acc
+
+    best_model = Pipeline([("vec", vec), ("clf", models[best_name])])
+    save_confusion_matrix(cms[best_name], LABELS, f"Confusion Matrix — {best_name} (streamed)", cm_out)
+    atomic_dump(best_model, model_out)
+    print(f"\nBest model: {best_name}  |  accuracy={best_acc:.3f}")
+    print(f"Saved model → {model_out}")
+    print(f"Saved confusion matrix → {cm_out}")
+    return best_model, best_name, best_acc
@@ -1,23 +1,87 @@
-import os
+import os, time
 import joblib
-from sklearn.pipeline import Pipeline
+import scipy.sparse as sp
+from typing import Callable, List, Optional, Tuple, Union
+from sklearn.pipeline import FeatureUnion, Pipeline
+from .artifact import CompactModel, is_compact_artifact, load_compact
 
-def load_model(model_path: str) -> Pipeline:
+Model = Union[Pipeline, CompactModel]
+# timer(stage, seconds): optional per-stage profiling hook, e.g. a histogram's observe
+StageTimer = Callable[[str, float], None]
+
+def load_model(model_path: str) -> Model:
+    """Load a joblib Pipeline, or a compact artifact directory (see models/artifact.py)."""
     if not os.path.exists(model_path):
         raise FileNotFoundError(f"Model not found: {model_path}. Run training first.")
+    if is_compact_artifact(model_path):
+        return load_compact(model_path)
     return joblib.load(model_path)
 
-def predict_text(pipeline: Pipeline, text: str, low_conf: float = 0.45) -> str:
+def warm_up(model: Model) -> None:
+    """Pay first-call costs (page faults, lazy sklearn setup) before serving traffic."""
+    if isinstance(model, CompactModel):
+        model.warm_up()
+    else:
+        predict_proba_batch(model, ["warm up the model"])
+
+def _transform_staged(vec, texts: List[str], timer: StageTimer):
+    """vec.transform(texts), timing each FeatureUnion block and the hstack separately.
+       Equivalent to FeatureUnion.transform for sparse blocks (weights applied, CSR out)."""
+    if not isinstance(vec, FeatureUnion):
+        t0 = time.perf_counter()
+        X = vec.transform(texts)
+        timer("vec", time.perf_counter() - t0)
+        return X
+    weights = vec.transformer_weights or {}
+    parts = []
+    for name, trans in vec.transformer_list:
+        if trans is None or trans == "drop":
+            continue
+        t0 = time.perf_counter()
+        X = trans.transform(texts)
+        if name in weights:
+            X = X * weights[name]
+        parts.append(X)
+        timer(f"vec:{name}", time.perf_counter() - t0)
+    t0 = time.perf_counter()
+    X = sp.hstack(parts).tocsr()
+    timer("hstack", time.perf_counter() - t0)
+    return X
+
+def _predict_proba(model: Model, texts: List[str], timer: Optional[StageTimer] = None):
+    """(classes, probs) or (None, None) if the classifier has no predict_proba."""
+    if isinstance(model, CompactModel):
+        return model.classes_, model.predict_proba(texts, timer=timer)
+    clf = model.named_steps.get("clf")
+    vec = model.named_steps.get("vec")
+    if not hasattr(clf, "predict_proba"):
+        return None, None
+    if timer is None:
+        return clf.classes_, clf.predict_proba(vec.transform(texts))
+    X = _transform_staged(vec, texts, timer)
+    t0 = time.perf_counter()
+    probs = clf.predict_proba(X)
+    timer("clf", time.perf_counter() - t0)
+    return clf.classes_, probs
+
+def predict_proba_batch(pipeline: Model, texts: List[str],
+                        timer: Optional[StageTimer] = None) -> List[List[Tuple[str, float]]]:
+    """Vectorized scoring: one transform + one predict_proba for all texts.
+       Returns, per text, [(class, prob), ...] descending; [(pred, 1.0)] if the
+       classifier has no predict_proba. `timer` receives per-stage durations."""
+    classes, probs = _predict_proba(pipeline, texts, timer)
+    if probs is not None:
+        return [sorted(zip(classes, row), key=lambda x: -x[1]) for row in probs]
+    return [[(pred, 1.0)] for pred in pipeline.predict(texts)]
+
+def predict_text(pipeline: Model, text: str, low_conf: float = 0.45) -> str:
     """Return formatted prediction string; includes confidence if available."""
     pred = pipeline.predict([text])[0]
     conf_msg = ""
-    clf = pipeline.named_steps.get("clf")
-    vec = pipeline.named_steps.get("vec")
+    classes, probs = _predict_proba(pipeline, [text])
 
-    if hasattr(clf, "predict_proba"):
-        probs = clf.predict_proba(vec.transform([text]))[0]
-        classes = clf.classes_
-        pairs = sorted(zip(classes, probs), key=lambda x: -x[1])
+    if probs is not None:
+        pairs = sorted(zip(classes, probs[0]), key=lambda x: -x[1])
         top_c, top_p = pairs[0]
         conf_msg = " | " + ", ".join(f"{c}: {p:.2f}" for c, p in pairs)
         if top_p < low_conf:
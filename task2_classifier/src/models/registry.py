@@ -0,0 +1,169 @@
+# src/models/registry.py
+# Versioned model registry. Each published version is an immutable directory; the
+# active one is named by a CURRENT pointer file that is replaced atomically, and the
+# one active before it by PREVIOUS (what a rollback returns to).
+#
+#   registry/
+#     CURRENT                      "v0003"
+#     PREVIOUS                     "v0001"
+#     v0001/ meta.json model.joblib
+#     v0002/ meta.json model.compact/
+#     v0003/ ...
+#
+# Old versions are pruned after each publish (and by `models --prune`): the newest
+# `keep` versions survive, plus CURRENT and the version a rollback would return to.
+import hashlib, json, os, re, shutil, tempfile, time
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+CURRENT_FILE = "CURRENT"
+PREVIOUS_FILE = "PREVIOUS"
+META_FILE = "meta.json"
+_VERSION_RE = re.compile(r"^v(\d{4,})$")
+
+def atomic_dump(obj, path) -> None:
+    """joblib.dump to a temp file in the same directory, then rename over `path`,
+       so readers never see a half-written model."""
+    import joblib   # only writers need it; `models` listing stays light
+    path = Path(path)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=path.name + ".", suffix=".tmp")
+    os.close(fd)
+    try:
+        joblib.dump(obj, tmp)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+def file_hash(path, block: int = 1 << 20) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(block), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+def list_versions(registry_dir) -> List[str]:
+    root = Path(registry_dir)
+    if not root.is_dir():
+        return []
+    found = [p.name for p in root.iterdir() if p.is_dir() and _VERSION_RE.match(p.name)]
+    return sorted(found, key=lambda v: int(v[1:]))
+
+def _read_pointer(registry_dir, name: str) -> Optional[str]:
+    p = Path(registry_dir) / name
+    if not p.exists():
+        return None
+    v = p.read_text(encoding="utf-8").strip()
+    return v or None
+
+def _write_pointer(registry_dir, name: str, version: str) -> None:
+    root = Path(registry_dir)
+    tmp = root / f".{name}.{os.getpid()}.tmp"
+    tmp.write_text(version + "\n", encoding="utf-8")
+    os.replace(tmp, root / name)
+
+def current_version(registry_dir) -> Optional[str]:
+    return _read_pointer(registry_dir, CURRENT_FILE)
+
+def read_meta(registry_dir, version: str) -> dict:
+    with open(Path(registry_dir) / version / META_FILE, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def artifact_path(registry_dir, version: str) -> Path:
+    return Path(registry_dir) / version / read_meta(registry_dir, version)["artifact"]
+
+def resolve(registry_dir, version: Optional[str] = None) -> Tuple[str, Path]:
+    """(version, artifact path) of `version`, or of CURRENT if not given."""
+    version = version or current_version(registry_dir)
+    if not version:
+        raise FileNotFoundError(f"No active model in registry: {registry_dir}")
+    if not (Path(registry_dir) / version / META_FILE).exists():
+        raise FileNotFoundError(f"Unknown model version: {version}")
+    return version, artifact_path(registry_dir, version)
+
+def activate(registry_dir, version: str) -> None:
+    """Point CURRENT at `version` (write temp file + atomic rename); the version it
+       replaces becomes PREVIOUS."""
+    root = Path(registry_dir)
+    if not (root / version / META_FILE).exists():
+        raise FileNotFoundError(f"Unknown model version: {version}")
+    cur = current_version(root)
+    if cur and cur != version:
+        _write_pointer(root, PREVIOUS_FILE, cur)
+    _write_pointer(root, CURRENT_FILE, version)
+
+def previous_version(registry_dir) -> Optional[str]:
+    """The version that was active before CURRENT. Registries without a PREVIOUS
+       pointer (or whose PREVIOUS was deleted) fall back to the newest older version."""
+    versions = list_versions(registry_dir)
+    cur = current_version(registry_dir)
+    prev = _read_pointer(registry_dir, PREVIOUS_FILE)
+    if prev in versions and prev != cur:
+        return prev
+    older = [v for v in versions if cur is None or int(v[1:]) < int(cur[1:])]
+    return older[-1] if older else None
+
+def rollback(registry_dir) -> str:
+    prev = previous_version(registry_dir)
+    if prev is None:
+        raise FileNotFoundError("No earlier model version to roll back to")
+    activate(registry_dir, prev)
+    return prev
+
+def prune(registry_dir, keep: int) -> List[str]:
+    """Delete all but the newest `keep` versions, never CURRENT or its rollback target.
+       keep <= 0 keeps everything. Returns the removed versions."""
+    if keep <= 0:
+        return []
+    root = Path(registry_dir)
+    versions = list_versions(root)
+    cur = current_version(root)
+    protected = set(versions[-keep:]) | {cur, previous_version(root) if cur else None}
+    removed = []
+    for v in versions:
+        if v in protected:
+            continue
+        trash = root / f".trash-{v}-{os.getpid()}"
+        os.rename(root / v, trash)   # disappears from list_versions atomically
+        shutil.rmtree(trash, ignore_errors=True)
+        removed.append(v)
+    return removed
+
+def publish(registry_dir, artifact, meta: dict, activate_now: bool = True, keep: int = 0) -> str:
+    """Copy `artifact` (a .joblib file or a compact model directory) into a new
+       immutable version directory with meta.json, and optionally make it CURRENT.
+       The version is staged in a temp directory and renamed into place, so a
+       crashed or concurrent publisher never exposes a partial version. With keep > 0
+       older versions are pruned afterwards (see prune)."""
+    root = Path(registry_dir)
+    root.mkdir(parents=True, exist_ok=True)
+    artifact = Path(artifact)
+    name = "model.compact" if artifact.is_dir() else "model" + (artifact.suffix or ".joblib")
+    stage = Path(tempfile.mkdtemp(dir=root, prefix=".stage-"))
+    os.chmod(stage, 0o755)
+    try:
+        if artifact.is_dir():
+            shutil.copytree(artifact, stage / name)
+        else:
+            shutil.copy2(artifact, stage / name)
+        meta = dict(meta, artifact=name, published_at=time.strftime("%Y-%m-%dT%H:%M:%S%z"))
+        while True:
+            versions = list_versions(root)
+            version = f"v{(int(versions[-1][1:]) + 1) if versions else 1:04d}"
+            meta["version"] = version
+            with open(stage / META_FILE, "w", encoding="utf-8") as f:
+                json.dump(meta, f, indent=2, default=str)
+            try:
+                os.rename(stage, root / version)   # fails if another publisher took it
+                break
+            except OSError:
+                if not (root / version).exists():
+                    raise
+    except BaseException:
+        shutil.rmtree(stage, ignore_errors=True)
+        raise
+    if activate_now:
+        activate(root, version)
+    prune(root, keep)
+    return version
@@ -2,81 +2,222 @@ import warnings
 warnings.filterwarnings("ignore", category=UserWarning)
 warnings.filterwarnings("ignore", category=FutureWarning)
 
-import joblib
+import os, time
 import numpy as np
 import pandas as pd
-from typing import Tuple
+from typing import Dict, Tuple
+from concurrent.futures import ProcessPoolExecutor
+from joblib import Parallel, delayed
 from sklearn.pipeline import Pipeline
-from sklearn.metrics import accuracy_score, classification_report, confusion_matrix
+from sklearn.metrics import accuracy_score, classification_report, confusion_matrix, f1_score
 from sklearn.naive_bayes import MultinomialNB
 from sklearn.linear_model import LogisticRegression
-from sklearn.model_selection import train_test_split
+from sklearn.model_selection import StratifiedKFold, train_test_split
 from sklearn.utils.class_weight import compute_class_weight
 
-from ..config import LABELS, RSEED
-from ..features.vectorizer import build_vectorizer_union
+from ..config import LABELS, RSEED, FEATURE_CACHE_DIR, FEATURE_CACHE_MAX_MB
+from ..features.cache import cached_features, dataset_hash, features_key
+from ..features.vectorizer import build_vectorizer, DEFAULT_N_FEATURES
 from .plot import save_confusion_matrix
+from .registry import atomic_dump
+
+CANDIDATES = ("MultinomialNB", "LogReg")
+
+# Hyperparameter grid per candidate; the first entry is the classifier's default.
+PARAM_GRIDS = {
+    "MultinomialNB": [{"alpha": 1.0}, {"alpha": 0.3}, {"alpha": 0.1}],
+    "LogReg":        [{"C": 1.0}, {"C": 10.0}],
+}
+
+def build_classifier(name: str, **params):
+    if name == "MultinomialNB":
+        clf = MultinomialNB()
+    elif name == "LogReg":
+        clf = LogisticRegression(max_iter=2000, solver="saga", class_weight="balanced", random_state=RSEED)
+    else:
+        raise ValueError(f"Unknown model: {name!r}")
+    return clf.set_params(**params)
+
+def candidate_label(name: str, params: dict) -> str:
+    return name + ("(" + ", ".join(f"{k}={v}" for k, v in params.items()) + ")" if params else "")
+
+def balanced_sample_weight(y) -> np.ndarray:
+    """Per-class weights -> per-sample weights for NB (handles imbalance)."""
+    classes_ = np.unique(y)
+    class_weights = compute_class_weight(class_weight="balanced", classes=classes_, y=y)
+    cw_map = {c: w for c, w in zip(classes_, class_weights)}
+    return np.array([cw_map[v] for v in y])
+
+def _fit_candidate(name, params, X_train, y_train, X_test, y_test, sample_weight):
+    """Fit one classifier on precomputed features and score it (runs in a joblib worker)."""
+    clf = build_classifier(name, **params)
+    t0 = time.perf_counter()
+    if name == "MultinomialNB":
+        clf.fit(X_train, y_train, sample_weight=sample_weight)
+    else:
+        clf.fit(X_train, y_train)
+    fit_s = time.perf_counter() - t0
+    pred = clf.predict(X_test)
+    acc = accuracy_score(y_test, pred)
+    f1  = f1_score(y_test, pred, average="macro", zero_division=0)
+    rep = classification_report(y_test, pred, digits=3, zero_division=0)
+    cm  = confusion_matrix(y_test, pred, labels=LABELS)
+    return name, params, clf, acc, f1, rep, cm, fit_s
 
 def train_and_evaluate(
     df: pd.DataFrame,
     test_size: float,
     model_out: str,
     cm_out: str,
+    features: str = "union",
+    n_features: int = DEFAULT_N_FEATURES,
+    n_jobs: int = -1,
+    cache_dir=FEATURE_CACHE_DIR,
+    val_size: float = 0.2,
 ) -> Tuple[Pipeline, str, float]:
+    """Select the grid on a validation split carved out of the training rows, then
+       refit the winner on all training rows and score it once on the test split."""
     print(f"[data] rows={len(df)}", flush=True)
     print(f"[data] by class={df['label'].value_counts().to_dict()}", flush=True)
     X_train, X_test, y_train, y_test = train_test_split(
         df["text"], df["label"], test_size=test_size, random_state=RSEED, stratify=df["label"]
     )
-    print(f"[split] train={len(X_train)} test={len(X_test)} (test_size={test_size})", flush=True)
+    X_fit, X_val, y_fit, y_val = train_test_split(
+        X_train, y_train, test_size=val_size, random_state=RSEED, stratify=y_train
+    )
+    print(f"[split] train={len(X_train)} (fit={len(X_fit)} val={len(X_val)}) test={len(X_test)} "
+          f"(test_size={test_size} val_size={val_size})", flush=True)
 
-    vec_union = build_vectorizer_union()
-    print("[model] building pipelines…", flush=True)
-    # Per-class weights -> per-sample weights for NB (handles imbalance)
-    classes_ = np.unique(y_train)
-    class_weights = compute_class_weight(class_weight="balanced", classes=classes_, y=y_train)
-    cw_map = {c: w for c, w in zip(classes_, class_weights)}
-    sample_weight = np.array([cw_map[y] for y in y_train])
-
-    models = {
-        "MultinomialNB": Pipeline([("vec", vec_union), ("clf", MultinomialNB())]),
-        "LogReg": Pipeline([("vec", vec_union),
-                            ("clf", LogisticRegression(max_iter=2000, solver="saga",
-                                                       class_weight="balanced", random_state=RSEED))]),
-    }
-
-    best_name, best_acc, best_model = None, -1.0, None
-    reports = {}
-
-    for name, pipe in models.items():
-        if name == "MultinomialNB":
-            pipe.fit(X_train, y_train, clf__sample_weight=sample_weight)
-        else:
-            pipe.fit(X_train, y_train)
-
-        pred = pipe.predict(X_test)
-        acc = accuracy_score(y_test, pred)
-        rep = classification_report(y_test, pred, digits=3, zero_division=0)
-        cm  = confusion_matrix(y_test, pred, labels=LABELS)
-        reports[name] = (acc, rep, cm)
-
-        if acc > best_acc:
-            best_name, best_acc, best_model = name, acc, pipe
-
-    # Print summaries
-    for name, (acc, rep, _) in reports.items():
-        print(f"\n=== {name} ===")
-        print(f"Accuracy: {acc:.3f}")
-        print(rep)
+    # Featurize once per stage; every candidate below reuses the same sparse matrices.
+    print(f"[model] features={features}" + (f" n_features={n_features}" if features == "hashing" else ""), flush=True)
+    data_hash = dataset_hash(df)
+    stages = {}
+    for stage, (a, b) in (("select", (X_fit, X_val)), ("final", (X_train, X_test))):
+        vec = build_vectorizer(features, n_features)
+        extra = {"val_size": val_size} if stage == "select" else {}
+        key = features_key(data_hash, vec, test_size=test_size, seed=RSEED, **extra)
+        t0 = time.perf_counter()
+        stages[stage] = cached_features(vec, a, b, key, cache_dir, FEATURE_CACHE_MAX_MB)
+        print(f"[features] {stage}: {'cache hit' if stages[stage][3] else 'fitted'} key={key} "
+              f"shape={stages[stage][1].shape[1]} ({time.perf_counter() - t0:.2f}s)", flush=True)
+
+    _, F_fit, F_val, _ = stages["select"]
+    grid = [(name, params) for name in CANDIDATES for params in PARAM_GRIDS[name]]
+    print(f"[model] fitting {len(grid)} candidates on the validation split (n_jobs={n_jobs})…", flush=True)
+    results = Parallel(n_jobs=n_jobs)(
+        delayed(_fit_candidate)(name, params, F_fit, y_fit, F_val, y_val, balanced_sample_weight(y_fit))
+        for name, params in grid
+    )
+
+    # Rank on validation accuracy (ties keep grid order, i.e. the default params win)
+    print(f"\n=== Validation ({len(X_val)} rows) ===")
+    print(f"{'model':<28} {'val_acc':>8} {'val_f1':>8} {'fit_s':>7}")
+    best = None
+    for name, params, _, acc, f1, _, _, fit_s in results:
+        print(f"{candidate_label(name, params):<28} {acc:>8.3f} {f1:>8.3f} {fit_s:>7.2f}")
+        if best is None or acc > best[2]:
+            best = (name, params, acc)
+    best_name, best_params, val_acc = best
+    best_label = candidate_label(best_name, best_params)
+
+    # Refit the winner on all training rows; the test split is scored exactly once
+    vec, F_train, F_test, _ = stages["final"]
+    _, _, best_clf, test_acc, _, rep, cm_best, fit_s = _fit_candidate(
+        best_name, best_params, F_train, y_train, F_test, y_test, balanced_sample_weight(y_train))
+    print(f"\n=== {best_label} on test ({len(X_test)} rows) ===")
+    print(f"Accuracy: {test_acc:.3f}  (fit {fit_s:.2f}s)")
+    print(rep)
+    best_model = Pipeline([("vec", vec), ("clf", best_clf)])
 
     # Save CM for best
-    cm_best = reports[best_name][2]
     save_confusion_matrix(cm_best, LABELS, f"Confusion Matrix — {best_name}", cm_out)
 
     # Save the full pipeline
-    joblib.dump(best_model, model_out)
-    print(f"\nBest model: {best_name}  |  accuracy={best_acc:.3f}")
+    atomic_dump(best_model, model_out)
+    print(f"\nBest model: {best_label}  |  val accuracy={val_acc:.3f}  test accuracy={test_acc:.3f}")
     print(f"Saved model → {model_out}")
     print(f"Saved confusion matrix → {cm_out}")
 
-    return best_model, best_name, best_acc
+    return best_model, best_name, test_acc
+
+def _run_fold(fold, train_idx, test_idx, texts, labels, features, n_features, data_hash, k, cache_dir):
+    """One CV fold in a worker process: featurize (cached per fold), fit and score the whole grid."""
+    vec = build_vectorizer(features, n_features)
+    key = features_key(data_hash, vec, cv=k, fold=fold, seed=RSEED)
+    t0 = time.perf_counter()
+    _, F_train, F_test, hit = cached_features(vec, texts[train_idx], texts[test_idx], key, cache_dir,
+                                              FEATURE_CACHE_MAX_MB)
+    feat_s = time.perf_counter() - t0
+    y_train, y_test = labels[train_idx], labels[test_idx]
+    sample_weight = balanced_sample_weight(y_train)
+    scores = []
+    for name in CANDIDATES:
+        for params in PARAM_GRIDS[name]:
+            _, _, _, acc, f1, _, cm, fit_s = _fit_candidate(name, params, F_train, y_train, F_test, y_test, sample_weight)
+            scores.append((name, params, acc, f1, cm, fit_s))
+    return fold, hit, feat_s, scores
+
+def train_cv(
+    df: pd.DataFrame,
+    k: int,
+    model_out: str,
+    cm_out: str,
+    features: str = "union",
+    n_features: int = DEFAULT_N_FEATURES,
+    n_jobs: int = -1,
+    cache_dir=FEATURE_CACHE_DIR,
+) -> Tuple[Pipeline, str, float]:
+    """Stratified k-fold model selection: folds run concurrently on a process pool,
+       candidates are ranked by mean accuracy (ties: mean macro-F1), the confusion
+       matrices of the winner are summed over folds, and the winner is refit once on all rows."""
+    print(f"[data] rows={len(df)}", flush=True)
+    print(f"[data] by class={df['label'].value_counts().to_dict()}", flush=True)
+    texts, labels = df["text"].to_numpy(), df["label"].to_numpy()
+    data_hash = dataset_hash(df)
+    folds = list(StratifiedKFold(n_splits=k, shuffle=True, random_state=RSEED).split(texts, labels))
+    workers = min(k, os.cpu_count() or 1) if n_jobs < 1 else min(k, n_jobs)
+    print(f"[cv] folds={k} workers={workers} features={features}", flush=True)
+
+    t0 = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as ex:
+        futures = [ex.submit(_run_fold, i, tr, te, texts, labels, features, n_features, data_hash, k, cache_dir)
+                   for i, (tr, te) in enumerate(folds)]
+        fold_results = sorted((f.result() for f in futures), key=lambda r: r[0])
+    cv_s = time.perf_counter() - t0
+
+    per_cand: Dict[str, dict] = {}
+    for fold, hit, feat_s, scores in fold_results:
+        print(f"[cv] fold {fold}: features {'cache hit' if hit else 'fitted'} ({feat_s:.2f}s)", flush=True)
+        for name, params, acc, f1, cm, fit_s in scores:
+            c = per_cand.setdefault(candidate_label(name, params),
+                                    {"name": name, "params": params, "acc": [], "f1": [], "fit_s": [], "cm": 0})
+            c["acc"].append(acc); c["f1"].append(f1); c["fit_s"].append(fit_s); c["cm"] = c["cm"] + cm
+
+    print(f"\n=== Cross-validation ({k} folds, {cv_s:.2f}s) ===")
+    print(f"{'model':<28} {'acc_mean':>8} {'acc_std':>8} {'f1_mean':>8} {'f1_std':>8} {'fit_s':>7}")
+    best_label, best = None, None
+    for label, c in per_cand.items():
+        acc_m, f1_m = float(np.mean(c["acc"])), float(np.mean(c["f1"]))
+        print(f"{label:<28} {acc_m:>8.3f} {np.std(c['acc']):>8.3f} {f1_m:>8.3f} "
+              f"{np.std(c['f1']):>8.3f} {np.mean(c['fit_s']):>7.2f}")
+        if best is None or (acc_m, f1_m) > (float(np.mean(best["acc"])), float(np.mean(best["f1"]))):
+            best_label, best = label, c
+    best_acc = float(np.mean(best["acc"]))
+
+    save_confusion_matrix(best["cm"], LABELS, f"Confusion Matrix — {best['name']} ({k}-fold, summed)", cm_out)
+
+    # Refit the winner once on all rows
+    t0 = time.perf_counter()
+    best_model = Pipeline([("vec", build_vectorizer(features, n_features)),
+                           ("clf", build_classifier(best["name"], **best["params"]))])
+    if best["name"] == "MultinomialNB":
+        best_model.fit(texts, labels, clf__sample_weight=balanced_sample_weight(labels))
+    else:
+        best_model.fit(texts, labels)
+    print(f"[refit] {best_label} on all {len(df)} rows ({time.perf_counter() - t0:.2f}s)", flush=True)
+
+    atomic_dump(best_model, model_out)
+    print(f"\nBest model: {best_label}  |  cv accuracy={best_acc:.3f} ± {np.std(best['acc']):.3f}")
+    print(f"Saved model → {model_out}")
+    print(f"Saved confusion matrix → {cm_out}")
+    return best_model, best["name"], best_acc
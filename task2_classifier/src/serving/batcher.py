@@ -0,0 +1,75 @@
+# src/serving/batcher.py
+import os, queue, threading, time
+from concurrent.futures import Future
+from typing import Any, Callable, List, Sequence
+
+class MicroBatcher:
+    """Coalesce concurrent single-item calls into one batched call.
+
+    Callers submit() one item and get a Future back. A worker thread drains the
+    queue until `max_batch` items are collected or `max_wait_ms` has passed since
+    the first one arrived, runs `fn(items)` once and resolves every future with
+    its own result (or with the exception raised by `fn`).
+    """
+
+    def __init__(self, fn: Callable[[List[Any]], Sequence[Any]],
+                 max_batch: int = 32, max_wait_ms: float = 5.0, name: str = "micro-batcher"):
+        self.fn = fn
+        self.max_batch = max(1, int(max_batch))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+        self.name = name
+        self.batches = 0   # number of fn() calls
+        self.items = 0     # number of items served
+        self._q: "queue.Queue" = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+
+    def _ensure_worker(self) -> None:
+        # Started lazily, and restarted in a forked child (threads don't survive fork).
+        if self._pid == os.getpid() and self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._pid == os.getpid() and self._thread is not None and self._thread.is_alive():
+                return
+            if self._pid != os.getpid():
+                self._q = queue.Queue()
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, args=(self._q,), name=self.name, daemon=True)
+            self._thread.start()
+
+    def submit(self, item: Any) -> Future:
+        fut: Future = Future()
+        self._ensure_worker()
+        self._q.put((item, fut))
+        return fut
+
+    def __call__(self, item: Any, timeout: float = None) -> Any:
+        return self.submit(item).result(timeout=timeout)
+
+    def _run(self, q: "queue.Queue") -> None:
+        while True:
+            batch = [q.get()]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                try:
+                    batch.append(q.get(timeout=remaining) if remaining > 0 else q.get_nowait())
+                except queue.Empty:
+                    break
+            self._dispatch(batch)
+
+    def _dispatch(self, batch) -> None:
+        live = [(item, fut) for item, fut in batch if fut.set_running_or_notify_cancel()]
+        if not live:
+            return
+        try:
+            results = self.fn([item for item, _ in live])
+        except BaseException as e:
+            for _, fut in live:
+                fut.set_exception(e)
+            return
+        self.batches += 1
+        self.items += len(live)
+        for (_, fut), res in zip(live, results):
+            fut.set_result(res)
@@ -0,0 +1,70 @@
+# src/serving/cache.py
+import hashlib, threading, time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+
+def normalize_text(text: str) -> str:
+    """Collapse whitespace and lowercase. Both vectorizers lowercase and char_wb
+       collapses whitespace anyway, so this never changes a prediction but lets
+       re-sent snippets with cosmetic differences share a cache entry."""
+    return " ".join(text.lower().split())
+
+def text_key(text: str) -> str:
+    return hashlib.blake2b(normalize_text(text).encode("utf-8"), digest_size=16).hexdigest()
+
+class PredictionCache:
+    """Thread-safe bounded LRU with per-entry TTL. max_entries=0 disables caching."""
+
+    def __init__(self, max_entries: int = 10000, ttl_s: float = 3600.0):
+        self.max_entries = max(0, int(max_entries))
+        self.ttl_s = float(ttl_s)
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = self.expired = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        if not self.max_entries:
+            return None
+        now = time.monotonic()
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                self.misses += 1
+                return None
+            expires, value = item
+            if self.ttl_s > 0 and expires < now:
+                del self._data[key]
+                self.expired += 1
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: Hashable, value: Any) -> None:
+        if not self.max_entries:
+            return
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl_s, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._data),
+                "max_entries": self.max_entries,
+                "ttl_s": self.ttl_s,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expired": self.expired,
+            }
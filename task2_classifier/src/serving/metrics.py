@@ -0,0 +1,271 @@
+# src/serving/metrics.py
+# Minimal in-process metrics rendered in the Prometheus text exposition format
+# (no client library needed). Updates are a dict lookup, a bisect and a few adds
+# under a lock, cheap enough to leave on for every request.
+#
+# Under `serve` every worker keeps its own registry and snapshots it to
+# <dir>/<pid>.json about once a second (and on every scrape and on exit). A scrape
+# reaches one worker, which merges all snapshots: counters and histograms are summed
+# across workers, gauges keep a `worker` label (the slot 0..N-1). When a worker exits
+# the master folds its snapshot into <dir>/_dead.json, so totals never go backwards
+# when workers are respawned or restarted.
+import bisect, json, os, threading, time
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+# seconds: 50us .. 10s, roughly x2.5 per step
+LATENCY_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+                   0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+
+FLUSH_INTERVAL_S = 1.0   # how stale other workers' numbers can be in a scrape
+DEAD_FILE = "_dead.json"
+
+_worker_slot: Optional[int] = None   # None outside `serve`: single process, nothing to merge
+_mp_dir: Optional[str] = None
+_registries: List["Registry"] = []
+
+def _escape(v: str) -> str:
+    return str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _fmt_labels(pairs: Iterable[Tuple[str, str]]) -> str:
+    body = ",".join(f'{k}="{_escape(v)}"' for k, v in pairs)
+    return "{" + body + "}" if body else ""
+
+def _fmt_num(x: float) -> str:
+    if x == float("inf"):
+        return "+Inf"
+    return repr(float(x)) if isinstance(x, float) else str(x)
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, doc: str, labelnames: Sequence[str] = ()):
+        self.name, self.doc = name, doc
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(n, "")) for n in self.labelnames)
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.doc}", f"# TYPE {self.name} {self.kind}"]
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name, doc, labelnames=()):
+        super().__init__(name, doc, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def dump(self) -> Dict[str, float]:
+        with self._lock:
+            return {json.dumps(k): v for k, v in self._values.items()}
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_fmt_labels(zip(self.labelnames, k))} {_fmt_num(v)}"
+                for k, v in sorted(items)]
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value: float, **labels) -> None:
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def replace(self, value: float, **labels) -> None:
+        """Drop all other label sets, e.g. an info-style gauge for the model version."""
+        with self._lock:
+            self._values = {self._key(labels): value}
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, doc, labelnames=(), buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, doc, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # key -> [per-bucket counts (+Inf last), sum]
+        self._series: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            s = self._series.get(key)
+            if s is None:
+                s = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            s[0][i] += 1
+            s[1] += value
+
+    def snapshot(self, **labels) -> Tuple[List[int], float]:
+        """(cumulative bucket counts incl. +Inf, sum) for one label set."""
+        with self._lock:
+            s = self._series.get(self._key(labels))
+            counts, total = (list(s[0]), s[1]) if s else ([0] * (len(self.buckets) + 1), 0.0)
+        cum, acc = [], 0
+        for c in counts:
+            acc += c
+            cum.append(acc)
+        return cum, total
+
+    def dump(self) -> Dict[str, list]:
+        with self._lock:
+            return {json.dumps(k): [list(s[0]), s[1]] for k, s in self._series.items()}
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = [(k, list(s[0]), s[1]) for k, s in self._series.items()]
+        out = []
+        for key, counts, total in sorted(items):
+            base = list(zip(self.labelnames, key))
+            acc = 0
+            for bound, c in zip(self.buckets + (float("inf"),), counts):
+                acc += c
+                le = "+Inf" if bound == float("inf") else repr(float(bound))
+                out.append(f"{self.name}_bucket{_fmt_labels(base + [('le', le)])} {acc}")
+            out.append(f"{self.name}_sum{_fmt_labels(base)} {_fmt_num(total)}")
+            out.append(f"{self.name}_count{_fmt_labels(base)} {acc}")
+        return out
+
+class Registry:
+    def __init__(self):
+        self.metrics: List[_Metric] = []
+        _registries.append(self)
+
+    def register(self, metric: _Metric) -> _Metric:
+        self.metrics.append(metric)
+        return metric
+
+    def counter(self, name, doc, labelnames=()) -> Counter:
+        return self.register(Counter(name, doc, labelnames))
+
+    def gauge(self, name, doc, labelnames=()) -> Gauge:
+        return self.register(Gauge(name, doc, labelnames))
+
+    def histogram(self, name, doc, labelnames=(), buckets=LATENCY_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, doc, labelnames, buckets))
+
+    def render(self) -> str:
+        """Prometheus text format (version 0.0.4); under `serve`, merged across workers."""
+        metrics = self.metrics
+        if _mp_dir is not None:
+            flush()
+            metrics = self._merged(_read_snapshots(_mp_dir))
+        lines: List[str] = []
+        for m in metrics:
+            lines += m.header()
+            lines += m.samples()
+        return "\n".join(lines) + "\n"
+
+    def _merged(self, snapshots: List[dict]) -> List[_Metric]:
+        """Fresh metrics holding the sum over snapshots (gauges: one series per live worker)."""
+        out: List[_Metric] = []
+        for m in self.metrics:
+            if isinstance(m, Histogram):
+                agg = Histogram(m.name, m.doc, m.labelnames, m.buckets)
+                for snap in snapshots:
+                    for k, (counts, total) in _series(snap, m.name):
+                        s = agg._series.setdefault(tuple(json.loads(k)), [[0] * len(counts), 0.0])
+                        s[0] = [a + b for a, b in zip(s[0], counts)]
+                        s[1] += total
+            elif isinstance(m, Gauge):
+                agg = Gauge(m.name, m.doc, m.labelnames + ("worker",))
+                for snap in snapshots:
+                    if snap.get("slot") is None:   # _dead.json: exited workers have no current value
+                        continue
+                    for k, v in _series(snap, m.name):
+                        agg._values[tuple(json.loads(k)) + (str(snap["slot"]),)] = v
+            else:
+                agg = Counter(m.name, m.doc, m.labelnames)
+                for snap in snapshots:
+                    for k, v in _series(snap, m.name):
+                        key = tuple(json.loads(k))
+                        agg._values[key] = agg._values.get(key, 0) + v
+            out.append(agg)
+        return out
+
+# ------------------------------
+# Multiprocess mode (prefork workers)
+# ------------------------------
+def _write_json(path: str, obj) -> None:
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(obj, f)
+    os.replace(tmp, path)   # readers see the old or the new snapshot, never half of one
+
+def _read_json(path: str) -> Optional[dict]:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def flush() -> None:
+    """Write this worker's snapshot of every registry to <dir>/<pid>.json."""
+    if _mp_dir is None:
+        return
+    snap = {"pid": os.getpid(), "slot": _worker_slot,
+            "metrics": {m.name: {"kind": m.kind, "series": m.dump()} for r in _registries for m in r.metrics}}
+    _write_json(os.path.join(_mp_dir, f"{os.getpid()}.json"), snap)
+
+def _series(snap: dict, name: str):
+    return snap["metrics"].get(name, {}).get("series", {}).items()
+
+def _read_snapshots(directory: str) -> List[dict]:
+    # Live snapshots first, then _dead.json: the master writes _dead.json before it
+    # deletes the snapshot it merged, so a worker is counted exactly once.
+    live = [_read_json(os.path.join(directory, n)) for n in sorted(os.listdir(directory))
+            if n.endswith(".json") and n[:-5].isdigit()]
+    dead = _read_json(os.path.join(directory, DEAD_FILE)) or {"merged": [], "metrics": {}}
+    merged = set(dead["merged"])
+    return [s for s in live if s is not None and s["pid"] not in merged] + [dead]
+
+def start_worker(directory: str, slot: int) -> None:
+    """Called in a freshly forked worker: label gauges with `slot`, snapshot to `directory`."""
+    global _mp_dir, _worker_slot
+    _mp_dir, _worker_slot = directory, slot
+
+    def loop():
+        while True:
+            time.sleep(FLUSH_INTERVAL_S)
+            try:
+                flush()
+            except OSError:
+                pass   # directory gone: the master is shutting down
+
+    threading.Thread(target=loop, name="metrics-flush", daemon=True).start()
+
+def merge_dead(directory: str, pid: int) -> None:
+    """Master side, after reaping worker `pid`: add its counters and histograms to
+       _dead.json and drop its snapshot (a worker killed hard loses < FLUSH_INTERVAL_S)."""
+    path = os.path.join(directory, f"{pid}.json")
+    snap = _read_json(path)
+    if snap is not None:
+        dead = _read_json(os.path.join(directory, DEAD_FILE)) or {"merged": [], "metrics": {}}
+        for name, m in snap["metrics"].items():
+            if m["kind"] == "gauge":   # a gauge's value dies with its worker
+                continue
+            acc = dead["metrics"].setdefault(name, {"kind": m["kind"], "series": {}})["series"]
+            for k, v in m["series"].items():
+                if m["kind"] == "histogram":   # [bucket counts, sum]
+                    old = acc.get(k, [[0] * len(v[0]), 0.0])
+                    acc[k] = [[a + b for a, b in zip(old[0], v[0])], old[1] + v[1]]
+                else:
+                    acc[k] = acc.get(k, 0) + v
+        dead["merged"].append(pid)
+        _write_json(os.path.join(directory, DEAD_FILE), dead)
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
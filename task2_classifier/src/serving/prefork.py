@@ -0,0 +1,216 @@
+# src/serving/prefork.py
+# Pre-forking WSGI server: the master loads + warms the model once, binds the
+# listening socket, then forks N workers that inherit both. Model arrays are only
+# read after the fork, so their pages stay shared copy-on-write (compact artifacts
+# are mmap'ed and shared through the page cache as well).
+#
+# Signals to the master:
+#   SIGHUP           graceful restart: reload the model, then replace workers one by one
+#   SIGTERM/SIGINT   graceful stop: workers finish in-flight requests and exit
+#
+# Each worker holds a slot 0..N-1; a respawned or replacement worker takes over
+# the slot of the one it replaces. Workers snapshot their metrics to a directory
+# owned by the master, so /metrics on any worker reports totals over all of them.
+#
+# A worker that dies unexpectedly is respawned. If it keeps dying within
+# RAPID_EXIT_S of starting, respawns back off exponentially, and after
+# MAX_RAPID_FAILURES in a row the master stops and exits 1 instead of fork-looping.
+import gc, os, shutil, signal, socket, sys, tempfile, threading, time
+from typing import Callable, Dict, Optional, Tuple
+
+from werkzeug.serving import make_server
+
+from . import metrics
+
+RAPID_EXIT_S = 10.0        # a worker exiting sooner than this after spawn counts as a failed start
+MAX_RAPID_FAILURES = 5     # consecutive failed starts of one slot before the master gives up
+BACKOFF_BASE_S = 0.5       # respawn delay after the 1st failed start, doubled per further failure
+BACKOFF_MAX_S = 30.0
+
+def _bind(host: str, port: int, backlog: int = 1024) -> socket.socket:
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+def _worker_main(app, sock: socket.socket, host: str, port: int, slot: int, metrics_dir: str) -> None:
+    """Serve on the inherited socket until SIGTERM, then drain in-flight requests."""
+    metrics.start_worker(metrics_dir, slot)
+    for sig in (signal.SIGHUP, signal.SIGINT):
+        signal.signal(sig, signal.SIG_IGN)
+    srv = make_server(host, port, app, threaded=True, fd=sock.fileno())
+    srv.daemon_threads = False   # let server_close() join request threads
+    srv.block_on_close = True
+    signal.signal(signal.SIGTERM, lambda *_: threading.Thread(target=srv.shutdown, daemon=True).start())
+    try:
+        srv.serve_forever(poll_interval=0.5)
+    finally:
+        srv.server_close()
+        metrics.flush()
+
+class PreforkServer:
+    def __init__(self, app, host: str = "127.0.0.1", port: int = 5000, workers: int = 2,
+                 on_reload: Optional[Callable[[], None]] = None, graceful_timeout: float = 30.0):
+        self.app = app
+        self.host, self.port = host, port
+        self.workers = max(1, int(workers))
+        self.on_reload = on_reload
+        self.graceful_timeout = graceful_timeout
+        self.children: Dict[int, Tuple[int, int]] = {}   # pid -> (generation, slot)
+        self.generation = 0
+        self.exit_code = 0
+        self._started: Dict[int, float] = {}       # pid -> spawn time
+        self._expected = set()                     # pids we are stopping on purpose
+        self._rapid_failures: Dict[int, int] = {}  # slot -> consecutive failed starts
+        self._respawn_at: Dict[int, float] = {}    # slot -> time of the pending respawn
+        self._stopping = False
+        self._reload_requested = False
+        self.sock: Optional[socket.socket] = None
+        self.metrics_dir: Optional[str] = None
+
+    def log(self, msg: str) -> None:
+        print(f"[serve:{os.getpid()}] {msg}", flush=True)
+
+    def _free_slot(self) -> int:
+        used = {slot for _, slot in self.children.values()}
+        return next(i for i in range(len(used) + 1) if i not in used)
+
+    def _spawn(self, slot: Optional[int] = None) -> int:
+        slot = self._free_slot() if slot is None else slot
+        pid = os.fork()
+        if pid == 0:
+            code = 0
+            try:
+                _worker_main(self.app, self.sock, self.host, self.port, slot, self.metrics_dir)
+            except BaseException:
+                import traceback; traceback.print_exc()
+                code = 1
+            finally:
+                os._exit(code)
+        self.children[pid] = (self.generation, slot)
+        self._started[pid] = time.monotonic()
+        return pid
+
+    def _reap(self) -> None:
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            _, slot = self.children.pop(pid, (None, None))
+            started = self._started.pop(pid, None)
+            if slot is not None:
+                metrics.merge_dead(self.metrics_dir, pid)
+            if slot is None or self._stopping:
+                continue
+            if pid in self._expected:
+                self._expected.discard(pid)
+                continue
+            uptime = time.monotonic() - started
+            failures = self._rapid_failures.get(slot, 0) + 1 if uptime < RAPID_EXIT_S else 0
+            self._rapid_failures[slot] = failures
+            if failures >= MAX_RAPID_FAILURES:
+                self.log(f"worker {pid} (slot {slot}) exited (status {status}) {failures} times in a row "
+                         f"within {RAPID_EXIT_S:.0f}s of starting; giving up")
+                self.exit_code = 1
+                self._stopping = True
+                continue
+            delay = min(BACKOFF_MAX_S, BACKOFF_BASE_S * 2 ** (failures - 1)) if failures else 0.0
+            self.log(f"worker {pid} (slot {slot}) exited (status {status}) after {uptime:.1f}s; respawning"
+                     + (f" in {delay:.1f}s" if delay else ""))
+            self._respawn_at[slot] = time.monotonic() + delay
+
+    def _respawn_due(self) -> None:
+        now = time.monotonic()
+        for slot, at in sorted(self._respawn_at.items()):
+            if at <= now and not self._stopping:
+                del self._respawn_at[slot]
+                self._spawn(slot)
+
+    def _stop_children(self, pids) -> None:
+        self._expected.update(pids)
+        for pid in pids:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        deadline = time.monotonic() + self.graceful_timeout
+        while any(p in self.children for p in pids) and time.monotonic() < deadline:
+            self._reap()
+            time.sleep(0.05)
+        for pid in [p for p in pids if p in self.children]:
+            self.log(f"worker {pid} did not exit in {self.graceful_timeout}s; killing")
+            try:
+                os.kill(pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+        while any(p in self.children for p in pids):
+            self._reap()
+            time.sleep(0.05)
+
+    def _graceful_restart(self) -> None:
+        self.log("reloading model")
+        try:
+            if self.on_reload:
+                self.on_reload()
+        except Exception as e:
+            self.log(f"reload failed, keeping current workers: {e}")
+            return
+        gc.collect(); gc.freeze()
+        old = list(self.children)
+        self.generation += 1
+        replaced = 0
+        for pid in old:            # rolling: one new worker up before each old one stops
+            if pid not in self.children:
+                continue           # died meanwhile: _reap already scheduled its slot's respawn
+            self._spawn(self.children[pid][1])
+            self._stop_children([pid])
+            replaced += 1
+        self.log(f"restarted {replaced} workers (generation {self.generation})")
+
+    def run(self) -> int:
+        self.sock = _bind(self.host, self.port)
+        self.metrics_dir = tempfile.mkdtemp(prefix="classifier-metrics-")
+        signal.signal(signal.SIGTERM, self._on_stop)
+        signal.signal(signal.SIGINT, self._on_stop)
+        signal.signal(signal.SIGHUP, self._on_hup)
+        # Move everything loaded so far out of the GC's reach so collections in the
+        # workers don't write to (and un-share) the model's pages.
+        gc.collect(); gc.freeze()
+        for _ in range(self.workers):
+            self._spawn()
+        self.log(f"listening on http://{self.host}:{self.port} with {self.workers} workers")
+        try:
+            while not self._stopping:
+                if self._reload_requested:
+                    self._reload_requested = False
+                    self._graceful_restart()
+                self._reap()
+                self._respawn_due()
+                time.sleep(0.2)
+        finally:
+            self.log("stopping workers")
+            self._stopping = True
+            self._stop_children(list(self.children))
+            self.sock.close()
+            shutil.rmtree(self.metrics_dir, ignore_errors=True)
+        return self.exit_code
+
+    def _on_stop(self, *_):
+        self._stopping = True
+
+    def _on_hup(self, *_):
+        self._reload_requested = True
+
+def serve_prefork(app, host: str, port: int, workers: int,
+                  on_reload: Optional[Callable[[], None]] = None, graceful_timeout: float = 30.0) -> None:
+    if not hasattr(os, "fork"):
+        sys.exit("serve requires os.fork (Linux/macOS); use `python app.py` instead.")
+    code = PreforkServer(app, host, port, workers, on_reload=on_reload, graceful_timeout=graceful_timeout).run()
+    if code:
+        sys.exit(code)